@@ -8,6 +8,14 @@ import scipy.integrate
 import numpy as np
 
 
+try:
+    from sklearn.utils.estimator_checks import (
+        check_get_params_invariance, check_set_params)
+    _HAS_SKLEARN_CHECKS = True
+except ImportError:
+    _HAS_SKLEARN_CHECKS = False
+
+
 class _FDataCallable():
 
     def __init__(self, function, *, domain_range, n_samples=1):
@@ -29,8 +37,16 @@ class _FDataCallable():
         def new_function(*args, **kwargs):
             return self.function(*args, **kwargs)[key]
 
-        tmp = np.empty(self.n_samples)
-        new_nsamples = len(tmp[key])
+        if isinstance(key, slice):
+            new_nsamples = len(range(*key.indices(self.n_samples)))
+        elif isinstance(key, (int, np.integer)):
+            new_nsamples = 1
+        else:
+            key_array = np.asarray(key)
+            if key_array.dtype == bool:
+                new_nsamples = int(np.count_nonzero(key_array))
+            else:
+                new_nsamples = len(key_array)
 
         return _FDataCallable(new_function,
                               domain_range=self.domain_range,
@@ -94,6 +110,18 @@ def _list_of_arrays(original_array):
 
     """
 
+    # Fast paths when the input already contains arrays
+    if isinstance(original_array, np.ndarray) and original_array.ndim > 0:
+        if original_array.ndim == 1:
+            return [original_array]
+        else:
+            return list(original_array)
+
+    if (isinstance(original_array, (list, tuple)) and original_array
+            and all(isinstance(a, np.ndarray) and a.ndim > 0
+                    for a in original_array)):
+        return list(original_array)
+
     unidimensional = False
 
     try:
@@ -121,22 +149,31 @@ def _to_array_maybe_ragged(array, *, row_shape=None):
 
     """
     def convert_row(row):
-        r = np.array(row)
+        # Rows that are already arrays are not copied here
+        r = np.asarray(row)
 
         if row_shape is not None:
             r = r.reshape(row_shape)
 
         return r
 
-    array_list = [convert_row(a) for a in array]
-    shapes = [a.shape for a in array_list]
+    rows = list(array)
+    array_list = [convert_row(a) for a in rows]
 
-    if all(s == shapes[0] for s in shapes):
+    if not array_list:
         return np.array(array_list)
+
+    first_shape = array_list[0].shape
+
+    if all(a.shape == first_shape for a in array_list):
+        return np.stack(array_list)
     else:
         res = np.empty(len(array_list), dtype=np.object_)
 
-        for i, a in enumerate(array_list):
+        for i, (row, a) in enumerate(zip(rows, array_list)):
+            # The rows of the result must not be views of the input
+            if isinstance(row, np.ndarray) and np.may_share_memory(row, a):
+                a = a.copy()
             res[i] = a
 
         return res
@@ -179,12 +216,23 @@ def _cartesian_product(axes, flatten=True, return_shape=False):
                [1]])
 
     """
-    cartesian = np.stack(np.meshgrid(*axes, indexing='ij'), -1)
+    axes = [np.asarray(a) for a in axes]
+    sizes = [len(a) for a in axes]
+    shape = tuple(sizes) + (len(axes),)
+
+    n_points = int(np.prod(sizes))
 
-    shape = cartesian.shape
+    cartesian = np.empty((n_points, len(axes)),
+                         dtype=np.result_type(*axes))
 
-    if flatten:
-        cartesian = cartesian.reshape(-1, len(axes))
+    # Fill each column directly, avoiding the meshgrid intermediates
+    for k, a in enumerate(axes):
+        reps_before = int(np.prod(sizes[:k]))
+        reps_after = int(np.prod(sizes[k + 1:]))
+        cartesian[:, k] = np.tile(np.repeat(a, reps_after), reps_before)
+
+    if not flatten:
+        cartesian = cartesian.reshape(shape)
 
     if return_shape:
         return cartesian, shape
@@ -194,7 +242,17 @@ def _cartesian_product(axes, flatten=True, return_shape=False):
 
 def _same_domain(fd, fd2):
     """Check if the domain range of two objects is the same."""
-    return np.array_equal(fd.domain_range, fd2.domain_range)
+    domain_range1 = fd.domain_range
+    domain_range2 = fd2.domain_range
+
+    if domain_range1 is domain_range2:
+        return True
+
+    try:
+        return (tuple(map(tuple, domain_range1))
+                == tuple(map(tuple, domain_range2)))
+    except TypeError:
+        return np.array_equal(domain_range1, domain_range2)
 
 
 def _reshape_eval_points(eval_points, *, aligned, n_samples, dim_domain):
@@ -216,6 +274,14 @@ def _reshape_eval_points(eval_points, *, aligned, n_samples, dim_domain):
 
     """
 
+    # Fast paths for the most common aligned inputs
+    if aligned and isinstance(eval_points, np.ndarray):
+        if dim_domain == 1 and eval_points.ndim == 1:
+            return eval_points.reshape(-1, 1)
+
+        if eval_points.ndim == 2 and eval_points.shape[1] == dim_domain:
+            return eval_points
+
     if aligned:
         eval_points = np.asarray(eval_points)
     else:
@@ -230,8 +296,9 @@ def _reshape_eval_points(eval_points, *, aligned, n_samples, dim_domain):
 
     if aligned:  # Samples evaluated at same eval points
 
-        eval_points = eval_points.reshape((eval_points.shape[0],
-                                           dim_domain))
+        if eval_points.ndim != 2 or eval_points.shape[1] != dim_domain:
+            eval_points = eval_points.reshape((eval_points.shape[0],
+                                               dim_domain))
 
     else:  # Different eval_points for each sample
 
@@ -251,6 +318,17 @@ def _one_grid_to_points(axes, *, dim_domain):
     Returns also the shape containing the information of how each point
     is formed.
     """
+    # Fast path for the univariate case, which does not need a product
+    if dim_domain == 1:
+        if (isinstance(axes, (list, tuple)) and len(axes) == 1
+                and isinstance(axes[0], np.ndarray)):
+            axis = axes[0]
+        else:
+            axis = axes
+
+        if isinstance(axis, np.ndarray) and axis.ndim == 1:
+            return axis.reshape(-1, 1), (axis.size,)
+
     axes = _list_of_arrays(axes)
 
     if len(axes) != dim_domain:
@@ -327,7 +405,7 @@ def _evaluate_grid(axes, *, evaluate_method,
         eval_points, shape = zip(
             *[_one_grid_to_points(a, dim_domain=dim_domain) for a in axes])
 
-    eval_points = np.array(eval_points)
+        eval_points = _to_array_maybe_ragged(eval_points)
 
     # Evaluate the points
     res = evaluate_method(eval_points,
@@ -350,25 +428,58 @@ def _evaluate_grid(axes, *, evaluate_method,
 
 
 def nquad_vec(func, ranges):
+    """Integrate a vector-valued function over a hyperrectangle.
 
-    initial_depth = len(ranges) - 1
+    Args:
+        func (callable): Function to integrate. It receives one scalar
+            argument per dimension and returns an array.
+        ranges (array_like): Integration limits for each dimension.
 
-    def integrate(*args, depth):
+    Returns:
+        (np.ndarray): Value of the integral.
 
-        if depth == 0:
-            f = functools.partial(func, *args)
-        else:
-            f = functools.partial(integrate, *args, depth=depth - 1)
+    Examples:
+
+        >>> from skfda._utils import nquad_vec
+        >>> nquad_vec(lambda x, y: np.array([x * y, 1]),
+        ...           [(0, 1), (0, 2)])
+        array([ 1.,  2.])
+
+    """
+    n_dims = len(ranges)
+
+    # Each level writes its integration variable in its own slot
+    args_buffer = [None] * n_dims
+
+    def integrand(dim):
+
+        if dim == n_dims - 1:
+            def innermost(x):
+                args_buffer[dim] = x
+                return func(*args_buffer)
 
-        return scipy.integrate.quad_vec(f, *ranges[initial_depth - depth])[0]
+            return innermost
 
-    return integrate(depth=initial_depth)
+        inner = integrand(dim + 1)
 
+        def step(x):
+            args_buffer[dim] = x
+            return scipy.integrate.quad_vec(inner, *ranges[dim + 1])[0]
 
-def _pairwise_commutative(function, arg1, arg2=None, **kwargs):
+        return step
+
+    return scipy.integrate.quad_vec(integrand(0), *ranges[0])[0]
+
+
+def _pairwise_commutative(function, arg1, arg2=None, *, broadcasts=False,
+                          **kwargs):
     """
     Compute pairwise a commutative function.
 
+    If `broadcasts` is True, `function` is assumed to support broadcasting
+    and, when two arguments are given, it is called once with them
+    broadcasted against each other, instead of gathering every pair.
+
     """
     if arg2 is None:
 
@@ -388,6 +499,10 @@ def _pairwise_commutative(function, arg1, arg2=None, **kwargs):
 
         return matrix
 
+    elif broadcasts:
+
+        return function(arg1[:, np.newaxis], arg2[np.newaxis, :], **kwargs)
+
     else:
 
         indices = np.indices((len(arg1), len(arg2)))
@@ -404,21 +519,25 @@ def parameter_aliases(**alias_assignments):
 
         if isinstance(f, (types.FunctionType, types.LambdaType)):
             # f is a function
+
+            # Names accepted for each parameter, computed only once
+            accepted_names = {
+                parameter_name: frozenset(tuple(aliases) + (parameter_name,))
+                for parameter_name, aliases in alias_assignments.items()}
+
             @functools.wraps(f)
             def aliasing_function(*args, **kwargs):
-                nonlocal alias_assignments
-                for parameter_name, aliases in alias_assignments.items():
-                    aliases = tuple(aliases)
-                    aliases_used = [a for a in kwargs
-                                    if a in aliases + (parameter_name,)]
+                for parameter_name, accepted in accepted_names.items():
+                    aliases_used = kwargs.keys() & accepted
                     if len(aliases_used) > 1:
                         raise ValueError(
                             f"Several arguments with the same meaning used: " +
-                            str(aliases_used))
+                            str([a for a in kwargs if a in aliases_used]))
 
-                    elif len(aliases_used) == 1:
-                        arg = kwargs.pop(aliases_used[0])
-                        kwargs[parameter_name] = arg
+                    elif aliases_used:
+                        alias = next(iter(aliases_used))
+                        if alias != parameter_name:
+                            kwargs[parameter_name] = kwargs.pop(alias)
 
                 return f(*args, **kwargs)
             return aliasing_function
@@ -429,7 +548,6 @@ def parameter_aliases(**alias_assignments):
             class cls(f):
                 pass
 
-            nonlocal alias_assignments
             init = cls.__init__
             cls.__init__ = parameter_aliases(**alias_assignments)(init)
 
@@ -458,8 +576,9 @@ def parameter_aliases(**alias_assignments):
 
 
 def _check_estimator(estimator):
-    from sklearn.utils.estimator_checks import (
-        check_get_params_invariance, check_set_params)
+    if not _HAS_SKLEARN_CHECKS:
+        raise ImportError("The estimator checks of scikit-learn could not "
+                          "be imported")
 
     name = estimator.__name__
     instance = estimator()
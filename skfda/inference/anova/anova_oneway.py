@@ -1,10 +1,73 @@
-import numpy as np
+import functools
+
+from joblib import Parallel, delayed, effective_n_jobs
+import scipy.integrate
+import scipy.stats
 from sklearn.utils import check_random_state
 
+import numpy as np
+
 from skfda import concatenate
 from skfda.misc.metrics import lp_distance
 from skfda.representation import FData, FDataGrid
-from skfda.datasets import make_gaussian_process
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# Number of bootstrap replicates whose statistic is computed at once
+_BOOTSTRAP_BLOCK_SIZE = 128
+
+
+def _is_univariate_grid(fd):
+    """Check if the vectorized computations over the data matrix apply."""
+    return (isinstance(fd, FDataGrid)
+            and fd.dim_domain == 1 and fd.dim_codomain == 1)
+
+
+@functools.lru_cache(maxsize=32)
+def _lower_triangle_mask(n):
+    """Boolean mask of the pairs (i, j) with i > j, in a (n, n) matrix."""
+    mask = np.tri(n, n, -1, dtype=bool)
+    mask.flags.writeable = False
+    return mask
+
+
+def _simpson_weights(sample_points):
+    """Weights w such that simps(y, x=sample_points) == y @ w."""
+    return scipy.integrate.simps(np.eye(len(sample_points)),
+                                 x=sample_points, axis=-1)
+
+
+@functools.lru_cache(maxsize=32)
+def _uniform_simpson_weights(n_points):
+    """Simpson weights of n_points equispaced points in [0, 1]."""
+    weights = _simpson_weights(np.linspace(0, 1, n_points))
+    weights.flags.writeable = False
+    return weights
+
+
+def _abs_power(values, p, out=None):
+    """Compute abs(values) ** p, avoiding the power for p = 1 and p = 2."""
+    if p == 2:
+        return np.multiply(values, values, out=out)
+
+    values = np.abs(values, out=out)
+    if p == 1:
+        return values
+
+    return np.power(values, p, out=values)
+
+
+def _lp_norm_p(values, sample_points, p):
+    """Integral of the p-th power of the last axis, as lp_norm(...) ** p."""
+    if p == 'inf' or np.isinf(p):
+        return np.max(np.abs(values), axis=-1) ** p
+
+    return scipy.integrate.simps(_abs_power(values, p), x=sample_points,
+                                 axis=-1)
 
 
 def v_sample_stat(fd, weights, p=2):
@@ -75,11 +138,28 @@ def v_sample_stat(fd, weights, p=2):
     if len(weights) != fd.n_samples:
         raise ValueError("Number of weights must match number of samples.")
 
+    if _is_univariate_grid(fd):
+        return _v_sample_stat_grid(fd.data_matrix[..., 0], weights,
+                                   fd.sample_points[0], p=p)
+
     t_ind = np.tril_indices(fd.n_samples, -1)
     coef = weights[t_ind[1]]
     return np.sum(coef * lp_distance(fd[t_ind[0]], fd[t_ind[1]], p=p) ** p)
 
 
+def _v_sample_stat_grid(data, weights, sample_points, p=2):
+    """Compute the sample statistic over a (k, m) data matrix."""
+
+    # Element (i, j) contains the p-th power of the norm of f_i - f_j
+    norms_p = _lp_norm_p(data[:, np.newaxis, :] - data[np.newaxis, :, :],
+                         sample_points, p)
+
+    mask = _lower_triangle_mask(len(data))
+
+    # Sum of the pairs for each column j, weighted by w_j
+    return np.where(mask, norms_p, 0).sum(axis=0) @ np.asarray(weights)
+
+
 def v_asymptotic_stat(fd, weights, p=2):
     r"""
     Calculates a statistic that measures the variability between groups of
@@ -149,6 +229,11 @@ def v_asymptotic_stat(fd, weights, p=2):
     if np.count_nonzero(weights) != len(weights):
         raise ValueError("All weights must be non-zero.")
 
+    if _is_univariate_grid(fd):
+        return _v_asymptotic_stat_grid(fd.data_matrix[..., 0], weights,
+                                       _simpson_weights(fd.sample_points[0]),
+                                       p=p)
+
     t_ind = np.tril_indices(fd.n_samples, -1)
     coef = np.sqrt(weights[t_ind[1]] / weights[t_ind[0]])
     left_fd = fd[t_ind[1]]
@@ -159,52 +244,326 @@ def v_asymptotic_stat(fd, weights, p=2):
     return np.sum(lp_distance(left_fd, right_fd, p=p) ** p)
 
 
-def _anova_bootstrap(fd_grouped, n_reps, random_state=None, p=2,
-                     equal_var=True):
+def _v_asymptotic_stat_grid(data, weights, integration_weights, p=2):
+    """Compute the asymptotic statistic over a (k, m) data matrix.
+
+    The data may have additional leading axes, in which case the statistic
+    is computed for each (k, m) matrix. The integrals are computed as dot
+    products with the integration weights of the sample points.
+
+    """
+    weights = np.asarray(weights, dtype=float)
+    n_groups = len(weights)
+    is_inf = p == 'inf' or np.isinf(p)
+
+    # Element (i, j) contains sqrt(w_j / w_i)
+    scale = np.sqrt(weights[np.newaxis, :] / weights[:, np.newaxis])
+
+    # The pairs are processed one row i at a time, reusing a buffer for the
+    # differences f_j - sqrt(w_j / w_i) * f_i with j < i
+    buffer = np.empty(data.shape, dtype=np.result_type(data, float))
+    result = np.zeros(data.shape[:-2])
+
+    for i in range(1, n_groups):
+        diff = buffer[..., :i, :]
+        np.multiply(scale[i, :i, np.newaxis], data[..., i:i + 1, :],
+                    out=diff)
+        np.subtract(data[..., :i, :], diff, out=diff)
+
+        if is_inf:
+            norms_p = np.max(np.abs(diff, out=diff), axis=-1) ** p
+        else:
+            norms_p = _abs_power(diff, p, out=diff) @ integration_weights
+
+        result += norms_p.sum(axis=-1, dtype=np.float64)
+
+    return result[()]
+
+
+def _weighted_gram(data, integration_weights):
+    """Matrices of the L2 inner products between the functions in data.
+
+    The integration weights are cast to the dtype of the data, so that
+    single precision data is not promoted to a double precision copy and
+    the product is computed in the precision of the data.
+
+    """
+    integration_weights = integration_weights.astype(data.dtype, copy=False)
+    return (data * integration_weights) @ np.swapaxes(data, -1, -2)
+
+
+def _v_asymptotic_stat_gram(data, weights, integration_weights):
+    """Compute the asymptotic statistic for p = 2 from the Gram matrices.
+
+    As ||f_j - a * f_i||^2 = <f_j, f_j> - 2 a <f_i, f_j> + a^2 <f_i, f_i>,
+    the norms of all the pairs are obtained from the (k, k) matrix of inner
+    products, computed with a single matrix product. The data may have
+    additional leading axes, as in :func:`_v_asymptotic_stat_grid`.
+
+    """
+    weights = np.asarray(weights, dtype=float)
+
+    # Element (i, j) contains sqrt(w_j / w_i)
+    scale = np.sqrt(weights[np.newaxis, :] / weights[:, np.newaxis])
+
+    gram = _weighted_gram(data, integration_weights)
+    gram = gram.astype(np.float64, copy=False)
+    squared_norms = np.diagonal(gram, axis1=-2, axis2=-1)
+
+    # Element (i, j) contains the squared norm of f_j - sqrt(w_j / w_i) * f_i
+    norms_p = (squared_norms[..., np.newaxis, :]
+               - 2 * scale * gram
+               + scale ** 2 * squared_norms[..., :, np.newaxis])
+
+    # Negative values can only arise from rounding errors
+    np.maximum(norms_p, 0, out=norms_p)
+
+    mask = _lower_triangle_mask(len(weights))
+
+    return norms_p[..., mask].sum(axis=-1)
+
+
+if numba is not None:
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _v_asymptotic_stat_numba(data, scale, integration_weights, p):
+        """Compiled asymptotic statistic for a (n_reps, k, m) array.
+
+        The differences, powers, integral and sum over the pairs are
+        fused in a single pass, without temporary arrays.
+
+        """
+        n_reps, n_groups, n_points = data.shape
+        v_samples = np.zeros(n_reps)
+
+        for r in numba.prange(n_reps):
+            total = 0.0
+            for i in range(n_groups):
+                for j in range(i):
+                    integral = 0.0
+                    for t in range(n_points):
+                        diff = abs(data[r, j, t] - scale[i, j] * data[r, i, t])
+                        if p == 2:
+                            value = diff * diff
+                        elif p == 1:
+                            value = diff
+                        else:
+                            value = diff ** p
+                        integral += value * integration_weights[t]
+                    total += integral
+            v_samples[r] = total
+
+        return v_samples
+
+
+def _gaussian_process_factor(cov):
+    """Compute a factor L such that Z @ L has covariance cov for white Z.
+
+    The SVD factorization used by :func:`numpy.random.multivariate_normal`
+    is used, as the covariance estimates are usually singular.
+
+    """
+    _, s, v = np.linalg.svd(cov)
+    return np.sqrt(s)[:, np.newaxis] * v
+
+
+def _covariance_matrix(fd_list):
+    """Covariance matrix of the samples of several FData objects."""
+    if all(_is_univariate_grid(fd) for fd in fd_list):
+        # The FData objects share their sample points, so it is enough to
+        # stack the data matrices
+        return np.cov(np.concatenate([fd.data_matrix[..., 0]
+                                      for fd in fd_list]),
+                      rowvar=False)
+
+    return concatenate(fd_list).cov().data_matrix[0, ..., 0]
+
+
+def _gaussian_process_factors(fd_grouped, equal_var=True):
+    """Gaussian process factors of the covariances of the groups."""
+    if equal_var:
+        return _gaussian_process_factor(_covariance_matrix(fd_grouped))
+
+    # Estimating covariances for each group
+    return np.stack([_gaussian_process_factor(_covariance_matrix([fd]))
+                     for fd in fd_grouped])
+
+
+def _check_random_state(random_state):
+    """Return a Generator unchanged, or a RandomState otherwise."""
+    if isinstance(random_state, np.random.Generator):
+        return random_state
+
+    return check_random_state(random_state)
+
+
+def _white_noise(factors, sizes, n_reps, *, random_state):
+    """Draw the white noise of n_reps replicates of the gaussian processes.
+
+    The noise has shape (n_groups, n_reps, n_features) and the dtype of the
+    factors.
+
+    """
+    shape = (len(sizes), n_reps, factors.shape[-1])
+
+    if isinstance(random_state, np.random.Generator):
+        # Generators can draw single precision samples directly
+        return random_state.standard_normal(shape, dtype=factors.dtype)
+
+    return random_state.standard_normal(shape).astype(factors.dtype,
+                                                      copy=False)
+
+
+def _anova_bootstrap_reps(factors, sizes, n_reps, *, random_state, p=2):
+    """Simulate n_reps values of the asymptotic statistic.
+
+    The factors are either one matrix shared by every group, or an array
+    with one matrix per group. The simulated processes have the same dtype
+    as the factors.
+
+    """
+    white_noise = _white_noise(factors, sizes, n_reps,
+                               random_state=random_state)
+
+    return _anova_bootstrap_stats(white_noise, factors, sizes, p=p)
+
+
+def _anova_bootstrap_stats(white_noise, factors, sizes, p=2):
+    """Asymptotic statistic of the gaussian processes of some white noise.
+
+    The white noise has shape (n_groups, n_reps, n_features), as returned
+    by :func:`_white_noise`.
+
+    """
+    n_reps = white_noise.shape[1]
+    n_features = factors.shape[-1]
+
+    # Observations of each of the n_groups gaussian processes, as an
+    # array with shape (n_reps, n_groups, n_features)
+    data = np.swapaxes(white_noise @ factors, 0, 1)
+
+    integration_weights = _uniform_simpson_weights(n_features)
+
+    if p == 2:
+        return _v_asymptotic_stat_gram(data, sizes, integration_weights)
+
+    if numba is not None and not (p == 'inf' or np.isinf(p)):
+        weights = np.asarray(sizes, dtype=float)
+        return _v_asymptotic_stat_numba(
+            np.ascontiguousarray(data),
+            np.sqrt(weights[np.newaxis, :] / weights[:, np.newaxis]),
+            integration_weights,
+            float(p))
+
+    # The statistic is computed in blocks to bound the memory used by
+    # the pairwise differences
+    v_samples = np.empty(n_reps)
+    for i in range(0, n_reps, _BOOTSTRAP_BLOCK_SIZE):
+        block = slice(i, i + _BOOTSTRAP_BLOCK_SIZE)
+        v_samples[block] = _v_asymptotic_stat_grid(data[block], sizes,
+                                                   integration_weights, p=p)
+    return v_samples
+
+
+def _validate_groups(fd_groups):
+    """Check that the groups can be compared by the ANOVA test."""
+    first = fd_groups[0]
+
+    if not all(isinstance(fd, type(first)) for fd in fd_groups[1:]):
+        raise TypeError('Found mixed FData types in arguments.')
+
+    for fd in fd_groups[1:]:
+        if not np.array_equal(fd.domain_range, first.domain_range):
+            raise ValueError("Domain range must match for every FData passed.")
+
+    if isinstance(first, FDataGrid):
+        if not all(np.array_equal(fd.sample_points[0], first.sample_points[0])
+                   for fd in fd_groups[1:]):
+            raise ValueError("All FDataGrid passed must have the same sample "
+                             "points.")
+    else:  # If type is FDataBasis, check same basis
+        if not all(fd.basis == first.basis for fd in fd_groups[1:]):
+            raise NotImplementedError("Not implemented for FDataBasis with "
+                                      "different basis.")
+
+
+def _anova_bootstrap_setup(fd_grouped, random_state=None, equal_var=True,
+                           dtype=np.float64):
+    """Compute the data shared by all the bootstrap replicates."""
 
     n_groups = len(fd_grouped)
     if n_groups < 2:
         raise ValueError("At least two groups must be passed in fd_grouped.")
 
-    for fd in fd_grouped[1:]:
-        if not np.array_equal(fd.domain_range, fd_grouped[0].domain_range):
-            raise ValueError("Domain range must match for every FData in "
-                             "fd_grouped.")
-
-    start, stop = fd_grouped[0].domain_range[0]
+    # The groups are validated by the caller with _validate_groups
 
     sizes = [fd.n_samples for fd in fd_grouped]  # List with sizes of each group
 
     # Instance a random state object in case random_state is an int
-    random_state = check_random_state(random_state)
+    random_state = _check_random_state(random_state)
 
-    if equal_var:
-        k_est = concatenate(fd_grouped).cov().data_matrix[0, ..., 0]
-        k_est = [k_est] * len(fd_grouped)
-    else:
-        # Estimating covariances for each group
-        k_est = [fd.cov().data_matrix[0, ..., 0] for fd in fd_grouped]
+    # The covariances are factorized only once, and the gaussian processes
+    # are sampled directly from the factors
+    factors = _gaussian_process_factors(fd_grouped, equal_var=equal_var)
 
-    # Number of sample points for gaussian processes have to match
-    # the features of the covariances.
-    n_features = k_est[0].shape[0]
+    return factors.astype(dtype, copy=False), sizes, random_state
 
-    # Simulating n_reps observations for each of the n_groups gaussian
-    # processes
-    sim = [make_gaussian_process(n_reps, n_features=n_features, start=start,
-                                 stop=stop, cov=k_est[i],
-                                 random_state=random_state)
-           for i in range(n_groups)]
 
-    v_samples = np.empty(n_reps)
-    for i in range(n_reps):
-        fd = FDataGrid([s.data_matrix[i, ..., 0] for s in sim])
-        v_samples[i] = v_asymptotic_stat(fd, sizes, p=p)
-    return v_samples
+def _anova_bootstrap_blocks(fd_grouped, n_reps, block_size,
+                            random_state=None, p=2, equal_var=True,
+                            dtype=np.float64):
+    """Generate the bootstrap replicates in blocks of block_size."""
+
+    factors, sizes, random_state = _anova_bootstrap_setup(
+        fd_grouped, random_state=random_state, equal_var=equal_var,
+        dtype=dtype)
+
+    for i in range(0, n_reps, block_size):
+        yield _anova_bootstrap_reps(factors, sizes,
+                                    min(block_size, n_reps - i),
+                                    random_state=random_state, p=p)
+
+
+def _anova_bootstrap(fd_grouped, n_reps, random_state=None, p=2,
+                     equal_var=True, n_jobs=1, dtype=np.float64):
+
+    factors, sizes, random_state = _anova_bootstrap_setup(
+        fd_grouped, random_state=random_state, equal_var=equal_var,
+        dtype=dtype)
+
+    n_chunks = min(effective_n_jobs(n_jobs), n_reps)
+
+    if n_chunks == 1:
+        return _anova_bootstrap_reps(factors, sizes, n_reps,
+                                     random_state=random_state, p=p)
+
+    # The noise is drawn in the same order as in the sequential case, and
+    # only the statistics are computed in parallel, so the simulated values
+    # do not depend on the number of jobs
+    white_noise = _white_noise(factors, sizes, n_reps,
+                               random_state=random_state)
+
+    v_samples = Parallel(n_jobs=n_jobs)(
+        delayed(_anova_bootstrap_stats)(chunk, factors, sizes, p=p)
+        for chunk in np.array_split(white_noise, n_chunks, axis=1))
+
+    return np.concatenate(v_samples)
+
+
+def _early_stop_interval(n_exceed, n_seen, alpha):
+    """Clopper-Pearson confidence interval for the p-value."""
+    lower = (0. if n_exceed == 0 else
+             scipy.stats.beta.ppf(alpha / 2, n_exceed,
+                                  n_seen - n_exceed + 1))
+    upper = (1. if n_exceed == n_seen else
+             scipy.stats.beta.ppf(1 - alpha / 2, n_exceed + 1,
+                                  n_seen - n_exceed))
+    return lower, upper
 
 
 def oneway_anova(*args, n_reps=2000, return_dist=False, random_state=None,
-                 p=2, equal_var=True):
+                 p=2, equal_var=True, n_jobs=1, early_stop=False,
+                 threshold=0.05, alpha=0.01, dtype=np.float64):
     r"""
     Performs one-way functional ANOVA.
 
@@ -245,7 +604,9 @@ def oneway_anova(*args, n_reps=2000, return_dist=False, random_state=None,
         return_dist (bool, optional): Flag to indicate if the function should
             return a numpy.array with the sampling distribution simulated.
 
-        random_state (optional): Random state.
+        random_state (optional): Random state. A
+            :class:`numpy.random.Generator` can also be passed, which
+            draws the samples faster and directly in the requested `dtype`.
 
         p (int, optional): p of the lp norm. Must be greater or equal
             than 1. If p='inf' or p=np.inf it is used the L infinity metric.
@@ -255,6 +616,32 @@ def oneway_anova(*args, n_reps=2000, return_dist=False, random_state=None,
             ANOVA assuming the same covariance operator for all the groups,
             else considers an independent covariance operator for each group.
 
+        n_jobs (int or None, optional): The number of parallel jobs used to
+            simulate the bootstrap distribution. ``None`` means 1 unless in a
+            :obj:`joblib.parallel_backend` context. ``-1`` means using all
+            processors. The random samples are drawn sequentially, so the
+            result for a given `random_state` does not depend on the
+            number of jobs, up to rounding errors. Defaults to 1.
+
+        early_stop (bool, optional): If True, the bootstrap replicates are
+            simulated in blocks, and the simulation stops as soon as a
+            Clopper-Pearson confidence interval for the p-value lies
+            entirely on one side of `threshold`. In that case the returned
+            distribution may have less than `n_reps` values, and `n_jobs`
+            is not used. Defaults to False.
+
+        threshold (float, optional): Significance level against which the
+            p-value is compared when `early_stop` is True. Defaults to 0.05.
+
+        alpha (float, optional): One minus the confidence level of the
+            interval used when `early_stop` is True. Defaults to 0.01.
+
+        dtype (data-type, optional): Floating point type used to store the
+            simulated gaussian processes. Using ``numpy.float32`` halves the
+            memory used by the bootstrap, with a precision loss far below
+            its Monte Carlo error. The statistics are always accumulated in
+            double precision. Defaults to ``numpy.float64``.
+
     Returns:
         Value of the sample statistic, p-value and sampling distribution of
         the simulated asymptotic statistic.
@@ -296,38 +683,54 @@ def oneway_anova(*args, n_reps=2000, return_dist=False, random_state=None,
         raise ValueError("Number of simulations must be positive.")
 
     fd_groups = args
-    if not all([isinstance(fd, type(fd_groups[0])) for fd in fd_groups[1:]]):
-        raise TypeError('Found mixed FData types in arguments.')
+    _validate_groups(fd_groups)
 
-    for fd in fd_groups[1:]:
-        if not np.array_equal(fd.domain_range, fd_groups[0].domain_range):
-            raise ValueError("Domain range must match for every FData passed.")
+    sizes = [fd.n_samples for fd in fd_groups]
 
-    if isinstance(fd_groups[0], FDataGrid):
-        # Creating list with all the sample points
-        list_sample = [fd.sample_points[0].tolist() for fd in fd_groups]
-        # Checking that the all the entries in the list are the same
-        if not list_sample.count(list_sample[0]) == len(list_sample):
-            raise ValueError("All FDataGrid passed must have the same sample "
-                             "points.")
-    else:  # If type is FDataBasis, check same basis
-        list_basis = [fd.basis for fd in fd_groups]
-        if not list_basis.count(list_basis[0]) == len(list_basis):
-            raise NotImplementedError("Not implemented for FDataBasis with "
-                                      "different basis.")
-
-    # FData where each sample is the mean of each group
-    fd_means = concatenate([fd.mean() for fd in fd_groups])
-
-    # Base statistic
-    vn = v_sample_stat(fd_means, [fd.n_samples for fd in fd_groups], p=p)
+    # Base statistic, computed with the mean of each group
+    if _is_univariate_grid(fd_groups[0]):
+        means = np.stack([fd.data_matrix[..., 0].mean(axis=0)
+                          for fd in fd_groups])
+        vn = _v_sample_stat_grid(means, sizes, fd_groups[0].sample_points[0],
+                                 p=p)
+    else:
+        fd_means = concatenate([fd.mean() for fd in fd_groups])
+        vn = v_sample_stat(fd_means, sizes, p=p)
 
     # Computing sampling distribution
-    simulation = _anova_bootstrap(fd_groups, n_reps,
-                                  random_state=random_state, p=p,
-                                  equal_var=equal_var)
+    if early_stop:
+        # Only the number of replicates exceeding the statistic is needed,
+        # so the blocks are kept only if the distribution is returned
+        blocks = []
+        n_seen = 0
+        n_exceed = 0
+
+        for block in _anova_bootstrap_blocks(fd_groups, n_reps,
+                                             _BOOTSTRAP_BLOCK_SIZE,
+                                             random_state=random_state,
+                                             p=p, equal_var=equal_var,
+                                             dtype=dtype):
+            if return_dist:
+                blocks.append(block)
+            n_seen += len(block)
+            n_exceed += np.count_nonzero(block > vn)
+
+            lower, upper = _early_stop_interval(n_exceed, n_seen, alpha)
+            if upper < threshold or lower > threshold:
+                break
+
+        p_value = n_exceed / n_seen
+
+        if return_dist:
+            simulation = np.concatenate(blocks)
+
+    else:
+        simulation = _anova_bootstrap(fd_groups, n_reps,
+                                      random_state=random_state, p=p,
+                                      equal_var=equal_var, n_jobs=n_jobs,
+                                      dtype=dtype)
 
-    p_value = np.sum(simulation > vn) / len(simulation)
+        p_value = np.count_nonzero(simulation > vn) / simulation.size
 
     if return_dist:
         return vn, p_value, simulation
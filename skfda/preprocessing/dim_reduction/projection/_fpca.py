@@ -1,13 +1,18 @@
 """Functional Principal Component Analysis Module."""
 
+import copy
+
 import skfda
-from skfda.misc.regularization import compute_penalty_matrix
+from skfda.misc.operators import gramian_matrix
+from skfda.misc.regularization import (compute_penalty_matrix,
+                                       TikhonovRegularization)
 from skfda.representation.basis import FDataBasis
 from skfda.representation.grid import FDataGrid
 
+import scipy.linalg
 from scipy.linalg import solve_triangular
 from sklearn.base import BaseEstimator, TransformerMixin
-from sklearn.decomposition import PCA
+from sklearn.utils.extmath import randomized_svd, svd_flip
 
 import numpy as np
 
@@ -16,6 +21,97 @@ __author__ = "Yujian Hong"
 __email__ = "yujian.hong@estudiante.uam.es"
 
 
+def _penalty_key(basis):
+    """Part of a basis (or grid identity basis) that defines its penalty.
+
+    For the identity basis of a grid only the sample points are needed, so
+    the (n_points, n_points) data matrix is not kept.
+
+    """
+    if isinstance(basis, FDataGrid):
+        return [np.array(s) for s in basis.sample_points]
+
+    return basis
+
+
+def _same_penalty_key(key, other):
+    """Check if two keys returned by :func:`_penalty_key` are equal."""
+    if isinstance(key, list) or isinstance(other, list):
+        return (isinstance(key, list) and isinstance(other, list)
+                and len(key) == len(other)
+                and all(np.array_equal(k, o) for k, o in zip(key, other)))
+
+    return type(key) == type(other) and key == other
+
+
+def _eigh_largest(matrix, n_eigenvalues):
+    """Largest eigenvalues and eigenvectors of a symmetric matrix."""
+    n = matrix.shape[0]
+    try:
+        return scipy.linalg.eigh(
+            matrix, subset_by_index=[n - n_eigenvalues, n - 1])
+    except TypeError:
+        # SciPy < 1.5
+        return scipy.linalg.eigh(
+            matrix, eigvals=(n - n_eigenvalues, n - 1))
+
+
+def _pca(matrix, n_components):
+    """Principal components of the rows of a matrix.
+
+    This computes the same components and explained variances as
+    :class:`sklearn.decomposition.PCA` with the default solver, directly
+    from the SVD of the centered matrix. As in that class, a randomized
+    SVD is used for big matrices when few components are needed. When
+    there are many more samples than features, the components are instead
+    the eigenvectors of the small (n_features, n_features) matrix
+    :math:`X^T X`.
+
+    The matrix is centered in place.
+
+    Returns:
+        tuple: the components as rows, the explained variance of each
+        component and the ratio of the total variance that it explains.
+
+    """
+    n_samples, n_features = matrix.shape
+    centered = matrix
+    centered -= matrix.mean(axis=0)
+
+    if n_samples > 2 * n_features:
+        # numpy computes the product of a matrix with its own transpose
+        # with a symmetric rank-k update
+        cross_product = centered.T @ centered
+
+        # only the eigenvectors of the largest eigenvalues are computed
+        eigenvalues, eigenvectors = _eigh_largest(cross_product,
+                                                  n_components)
+        eigenvalues = np.maximum(eigenvalues[::-1], 0)
+        components = eigenvectors[:, ::-1].T
+        singular_values = np.sqrt(eigenvalues)
+
+        # same signs as the SVD, using the scores instead of the left
+        # singular vectors, which are proportional to them
+        _, components = svd_flip(centered @ components.T, components)
+        total_variance = np.trace(cross_product) / (n_samples - 1)
+    elif (max(n_samples, n_features) > 500
+            and n_components < 0.8 * min(n_samples, n_features)):
+        _, singular_values, components = randomized_svd(
+            centered, n_components, n_iter='auto', flip_sign=True,
+            random_state=0)
+        total_variance = np.sum(np.var(centered, ddof=1, axis=0))
+    else:
+        u, singular_values, components = scipy.linalg.svd(
+            centered, full_matrices=False)
+        u, components = svd_flip(u, components)
+        total_variance = np.sum(singular_values ** 2) / (n_samples - 1)
+
+    explained_variance = singular_values[:n_components] ** 2 / (n_samples - 1)
+
+    return (components[:n_components], explained_variance,
+            explained_variance / total_variance)
+
+
 class FPCA(BaseEstimator, TransformerMixin):
     """Class that implements functional principal component analysis for both
     basis and grid representations of the data. Most parameters are shared
@@ -25,8 +121,7 @@ class FPCA(BaseEstimator, TransformerMixin):
         n_components (int): number of principal components to obtain from
             functional principal component analysis. Defaults to 3.
         centering (bool): if True then calculate the mean of the functional data
-            object and center the data first. Defaults to True. If True the
-            passed FDataBasis object is modified.
+            object and center the data first. Defaults to True.
         regularization (Regularization):
             Regularization object to be applied.
         components_basis (Basis): the basis in which we want the principal
@@ -47,7 +142,8 @@ class FPCA(BaseEstimator, TransformerMixin):
             each of the selected components.
         explained_variance_ratio_ (array_like): this contains the percentage of
             variance explained by each principal component.
-        mean_ (FData): mean of the train data.
+        mean_ (FData): mean of the train data. It is None if centering is
+            False.
 
 
     Examples:
@@ -91,12 +187,39 @@ class FPCA(BaseEstimator, TransformerMixin):
         self.weights = weights
         self.components_basis = components_basis
 
-    def _center_if_necessary(self, X, *, learn_mean=True):
+    def _penalty_matrix(self, basis, regularization):
+        """Penalty matrix of the regularization for a basis.
 
-        if learn_mean:
-            self.mean_ = X.mean()
+        This is the same as ``compute_penalty_matrix((basis,), 1,
+        regularization)``. The gramian matrix of a Tikhonov regularization
+        does not depend on the regularization parameter, so the last one is
+        kept by the estimator. This avoids recomputing it when the estimator
+        is refitted, for example changing the regularization parameter.
 
-        return X - self.mean_ if self.centering else X
+        """
+        if (not isinstance(regularization, TikhonovRegularization)
+                or regularization.regularization_parameter == 0):
+            return compute_penalty_matrix(
+                basis_iterable=(basis,),
+                regularization_parameter=1,
+                regularization=regularization)
+
+        linear_operator = regularization.linear_operator
+
+        # Operators of different types are never equal, and their __eq__
+        # may not accept them
+        key = _penalty_key(basis)
+        cached = getattr(self, "_penalty_cached", None)
+        if (cached is None
+                or not _same_penalty_key(cached[0], key)
+                or type(cached[1]) is not type(linear_operator)
+                or not cached[1] == linear_operator):
+            gramian = gramian_matrix(linear_operator, basis)
+            gramian.flags.writeable = False
+            cached = (key, copy.deepcopy(linear_operator), gramian)
+            self._penalty_cached = cached
+
+        return regularization.regularization_parameter * cached[2]
 
     def _fit_basis(self, X: FDataBasis, y=None):
         """Computes the first n_components principal components and saves them.
@@ -139,9 +262,11 @@ class FPCA(BaseEstimator, TransformerMixin):
                                  "smaller than the number of attributes of "
                                  "target principal components' basis.")
 
-        # if centering is True then subtract the mean function to each function
-        # in FDataBasis
-        X = self._center_if_necessary(X)
+        # the mean is only learnt here, and only if it is subtracted in
+        # transform. The final matrix is centered in place before computing
+        # its principal components, which is equivalent to subtracting the
+        # mean function to each function
+        self.mean_ = X.mean() if self.centering else None
 
         # setup principal component basis if not given
         components_basis = self.components_basis
@@ -155,52 +280,68 @@ class FPCA(BaseEstimator, TransformerMixin):
             j_matrix = X.basis.inner_product_matrix(components_basis)
         else:
             # if no other basis is specified we use the same basis as the passed
-            # FDataBasis Object
+            # FDataBasis Object. The gram matrix is computed before copying
+            # the basis, so that it is cached in the original one for later
+            # fits.
+            g_matrix = X.basis.gram_matrix()
             components_basis = X.basis.copy()
-            g_matrix = components_basis.gram_matrix()
             j_matrix = g_matrix
 
         self._X_basis = X.basis
-        self._j_matrix = j_matrix
 
-        # Apply regularization / penalty if applicable
-        regularization_matrix = compute_penalty_matrix(
-            basis_iterable=(components_basis,),
-            regularization_parameter=1,
-            regularization=self.regularization)
+        # Apply regularization / penalty if applicable. This must not be done
+        # in place, as the gram matrix is cached by the basis. The
+        # intermediate matrices are not kept in variables, so that they are
+        # freed as soon as possible
+        g_matrix = g_matrix + self._penalty_matrix(components_basis,
+                                                   self.regularization)
 
-        # apply regularization
-        g_matrix = (g_matrix + regularization_matrix)
-
-        # obtain triangulation using cholesky
-        l_matrix = np.linalg.cholesky(g_matrix)
+        # obtain triangulation using cholesky. The regularized gram matrix is
+        # a new symmetric matrix, so LAPACK can factorize its (Fortran
+        # ordered) transpose in place
+        l_matrix = scipy.linalg.cholesky(np.transpose(g_matrix), lower=True,
+                                         overwrite_a=True, check_finite=False)
 
         # we need L^{-1} for a multiplication, there are two possible ways:
         # using solve to get the multiplication result directly or just invert
         # the matrix. We choose solve because it is faster and more stable.
-        # The following matrix is needed: L^{-1}*J^T
-        l_inv_j_t = solve_triangular(l_matrix, np.transpose(j_matrix),
-                                     lower=True)
+        # The final matrix, C(L-1Jt)t for svd or (L-1Jt)-1CtC(L-1Jt)t for PCA,
+        # is equal to (L-1(CJ)t)t, so the triangular system is solved with
+        # whichever right hand side has fewer columns.
+        coefficients = X.coefficients
+        if coefficients.shape[0] < coefficients.shape[1]:
+            final_matrix = np.transpose(solve_triangular(
+                l_matrix, np.transpose(coefficients @ j_matrix), lower=True,
+                check_finite=False))
+        else:
+            final_matrix = coefficients @ np.transpose(solve_triangular(
+                l_matrix, np.transpose(j_matrix), lower=True,
+                check_finite=False))
 
-        # the final matrix, C(L-1Jt)t for svd or (L-1Jt)-1CtC(L-1Jt)t for PCA
-        final_matrix = (X.coefficients @ np.transpose(l_inv_j_t) /
-                        np.sqrt(n_samples))
+        final_matrix /= np.sqrt(n_samples)
 
-        # initialize the pca module provided by scikit-learn
-        pca = PCA(n_components=self.n_components)
-        pca.fit(final_matrix)
+        # the principal components are obtained directly from the SVD of
+        # the final matrix
+        components, explained_variance, explained_variance_ratio = _pca(
+            final_matrix, self.n_components)
 
         # we choose solve to obtain the component coefficients for the
-        # same reason: it is faster and more efficient
-        component_coefficients = solve_triangular(np.transpose(l_matrix),
-                                                  np.transpose(
-                                                      pca.components_),
-                                                  lower=False)
-
-        component_coefficients = np.transpose(component_coefficients)
-
-        self.explained_variance_ratio_ = pca.explained_variance_ratio_
-        self.explained_variance_ = pca.explained_variance_
+        # same reason: it is faster and more efficient. The system with
+        # L^t is solved using L directly, and its solution has the
+        # coefficients of each component as columns
+        component_coefficients_t = solve_triangular(l_matrix,
+                                                    np.transpose(components),
+                                                    trans='T', lower=True,
+                                                    check_finite=False)
+
+        component_coefficients = np.transpose(component_coefficients_t)
+
+        # the scores are the inner products of the data with the components,
+        # which reduce to a product with this matrix
+        self._projection_matrix = j_matrix @ component_coefficients_t
+
+        self.explained_variance_ratio_ = explained_variance_ratio
+        self.explained_variance_ = explained_variance
         self.components_ = X.copy(basis=components_basis,
                                   coefficients=component_coefficients)
 
@@ -225,9 +366,14 @@ class FPCA(BaseEstimator, TransformerMixin):
             raise ValueError("The basis used in fit is different from "
                              "the basis used in transform.")
 
-        # in this case it is the inner product of our data with the components
-        return (X.coefficients @ self._j_matrix
-                @ self.components_.coefficients.T)
+        # in this case it is the inner product of our data with the components.
+        # The projection is linear, so the data is centered by subtracting the
+        # projection of the mean, without copying the coefficients
+        scores = X.coefficients @ self._projection_matrix
+        if self.centering:
+            scores -= self.mean_.coefficients @ self._projection_matrix
+
+        return scores
 
     def _fit_grid(self, X: FDataGrid, y=None):
         r"""Computes the n_components first principal components and saves them.
@@ -273,55 +419,68 @@ class FPCA(BaseEstimator, TransformerMixin):
         # data matrix initialization
         fd_data = X.data_matrix.reshape(X.data_matrix.shape[:-1])
 
+        # single precision data is analysed in single precision
+        dtype = (fd_data.dtype if np.issubdtype(fd_data.dtype, np.floating)
+                 else np.float64)
+
         # get the number of samples and the number of points of descretization
         n_samples, n_points_discretization = fd_data.shape
 
-        # if centering is True then subtract the mean function to each function
-        # in FDataBasis
-        X = self._center_if_necessary(X)
+        # the mean is only learnt here, and only if it is subtracted in
+        # transform. The final matrix is centered in place before computing
+        # its principal components, which is equivalent to subtracting the
+        # mean function to each function
+        self.mean_ = X.mean() if self.centering else None
 
         # establish weights for each point of discretization
-        if not self.weights:
+        if self.weights is None:
             # sample_points is a list with one array in the 1D case
             # in trapezoidal rule, suppose \deltax_k = x_k - x_{k-1}, the weight
             # vector is as follows: [\deltax_1/2, \deltax_1/2 + \deltax_2/2,
             # \deltax_2/2 + \deltax_3/2, ... , \deltax_n/2]
-            differences = np.diff(X.sample_points[0])
-            differences = np.concatenate(((0,), differences, (0,)))
-            self.weights = (differences[:-1] + differences[1:]) / 2
+            half_differences = np.diff(X.sample_points[0]) / 2
+            weights = np.zeros(n_points_discretization)
+            weights[:-1] += half_differences
+            weights[1:] += half_differences
         elif callable(self.weights):
-            self.weights = self.weights(X.sample_points[0])
+            weights = self.weights(X.sample_points[0])
             # if its a FDataGrid then we need to reduce the dimension to 1-D
             # array
-            if isinstance(self.weights, FDataGrid):
-                self.weights = np.squeeze(self.weights.data_matrix)
-
-        weights_matrix = np.diag(self.weights)
-
-        basis = FDataGrid(
-            data_matrix=np.identity(n_points_discretization),
-            sample_points=X.sample_points
-        )
-
-        regularization_matrix = compute_penalty_matrix(
-            basis_iterable=(basis,),
-            regularization_parameter=1,
-            regularization=self.regularization)
-
-        fd_data = np.transpose(np.linalg.solve(
-            np.transpose(basis.data_matrix[..., 0] + regularization_matrix),
-            np.transpose(fd_data)))
+            if isinstance(weights, FDataGrid):
+                weights = np.squeeze(weights.data_matrix)
+        else:
+            weights = np.asarray(self.weights)
+
+        # the weight matrix is diagonal, so it is applied by scaling the
+        # columns with the square root of the weights
+        sqrt_weights = np.sqrt(weights).astype(dtype, copy=False)
+
+        # the regularization solves a linear system with the penalized
+        # identity matrix, which would leave the data unchanged without
+        # penalty
+        regularization = self.regularization
+        if (regularization is not None
+                and getattr(regularization, 'regularization_parameter', 1)):
+            # the penalty is added in place, and the identity basis is only
+            # kept while computing it
+            penalized_identity = np.identity(n_points_discretization)
+            penalized_identity += self._penalty_matrix(
+                FDataGrid(data_matrix=np.identity(n_points_discretization),
+                          sample_points=X.sample_points),
+                regularization)
+
+            fd_data = np.transpose(np.linalg.solve(
+                np.transpose(penalized_identity), np.transpose(fd_data)))
 
         # see docstring for more information
-        final_matrix = fd_data @ np.sqrt(weights_matrix) / np.sqrt(n_samples)
+        final_matrix = fd_data * (sqrt_weights / np.sqrt(n_samples))
+
+        components, explained_variance, explained_variance_ratio = _pca(
+            final_matrix, self.n_components)
 
-        pca = PCA(n_components=self.n_components)
-        pca.fit(final_matrix)
-        self.components_ = X.copy(data_matrix=np.transpose(
-            np.linalg.solve(np.sqrt(weights_matrix),
-                            np.transpose(pca.components_))))
-        self.explained_variance_ratio_ = pca.explained_variance_ratio_
-        self.explained_variance_ = pca.explained_variance_
+        self.components_ = X.copy(data_matrix=components / sqrt_weights)
+        self.explained_variance_ratio_ = explained_variance_ratio
+        self.explained_variance_ = explained_variance
 
         return self
 
@@ -340,13 +499,17 @@ class FPCA(BaseEstimator, TransformerMixin):
             principal components
         """
 
+        components = np.transpose(self.components_.data_matrix.reshape(
+            self.components_.data_matrix.shape[:-1]))
+
         # in this case its the coefficient matrix multiplied by the principal
-        # components as column vectors
+        # components as column vectors. As in the basis case, the data is
+        # centered by subtracting the projection of the mean
+        scores = X.data_matrix.reshape(X.data_matrix.shape[:-1]) @ components
+        if self.centering:
+            scores -= self.mean_.data_matrix[0, ..., 0] @ components
 
-        return X.data_matrix.reshape(
-            X.data_matrix.shape[:-1]) @ np.transpose(
-            self.components_.data_matrix.reshape(
-                self.components_.data_matrix.shape[:-1]))
+        return scores
 
     def fit(self, X, y=None):
         """Computes the n_components first principal components and saves them
@@ -382,8 +545,6 @@ class FPCA(BaseEstimator, TransformerMixin):
             (array_like): the scores of the data with reference to the
             principal components
         """
-        X = self._center_if_necessary(X, learn_mean=False)
-
         if isinstance(X, FDataGrid):
             return self._transform_grid(X, y)
         elif isinstance(X, FDataBasis):
@@ -14,29 +14,78 @@ import numpy as np
 from ... import FDataBasis
 from ... import FDataGrid
 from ..._utils import _cartesian_product
+from ...representation.basis import Tensor
 from ._linear import _LinearSmoother
 
+# Number of grids whose basis evaluation is kept by a smoother: the input
+# and the output points
+_BASIS_MATRIX_CACHE_SIZE = 2
+
 
 class _Cholesky():
     """Solve the linear equation using cholesky factorization"""
 
-    def __call__(self, *, basis_values, weight_matrix, data_matrix,
-                 penalty_matrix, **_):
+    def __call__(self, *, estimator, basis_values, weight_matrix,
+                 data_matrix, penalty_matrix, **_):
+
+        # The factorization only depends on the basis values, weights and
+        # penalty, so it is reused while they do not change. The basis
+        # values are cached by the estimator, so they are compared by
+        # identity
+        cached = getattr(estimator, "_cholesky_cached", None)
+        if (cached is not None
+                and cached[0] is basis_values
+                and cached[1] is weight_matrix
+                and np.array_equal(cached[2], penalty_matrix)):
+            common_matrix, factor = cached[3:]
+            coefficients = scipy.linalg.cho_solve(
+                factor, common_matrix @ data_matrix,
+                overwrite_b=True, check_finite=False)
+
+            return coefficients.T
 
         common_matrix = basis_values.T
 
         if weight_matrix is not None:
-            common_matrix @= weight_matrix
+            common_matrix = common_matrix @ weight_matrix
 
         right_matrix = common_matrix @ data_matrix
-        left_matrix = common_matrix @ basis_values
+
+        if weight_matrix is not None:
+            left_matrix = common_matrix @ basis_values
+        else:
+            left_matrix = estimator._tensor_gram_matrix(
+                estimator.input_points_)
+
+            if left_matrix is not None:
+                left_matrix = left_matrix.astype(basis_values.dtype,
+                                                 copy=False)
+            else:
+                # Symmetric rank-k update: only the lower triangle is
+                # computed, which is the only one read by the factorization
+                syrk = scipy.linalg.get_blas_funcs('syrk', (basis_values,))
+                left_matrix = syrk(1.0, basis_values, trans=1, lower=1)
 
         # Adds the roughness penalty to the equation
         if penalty_matrix is not None:
             left_matrix += penalty_matrix
 
-        coefficients = scipy.linalg.cho_solve(scipy.linalg.cho_factor(
-            left_matrix, lower=True), right_matrix)
+        # Factorize and solve in a single LAPACK call
+        posv = scipy.linalg.get_lapack_funcs('posv',
+                                             (left_matrix, right_matrix))
+        factor, coefficients, info = posv(left_matrix, right_matrix,
+                                          lower=True, overwrite_a=True,
+                                          overwrite_b=True)
+        if info > 0:
+            raise np.linalg.LinAlgError(
+                f"{info}-th leading minor not positive definite")
+        if info < 0:
+            raise ValueError(f"illegal value in {-info}-th argument of "
+                             f"internal posv")
+
+        estimator._cholesky_cached = (basis_values, weight_matrix,
+                                      penalty_matrix, common_matrix,
+                                      (factor, True))
 
         # The ith column is the coefficients of the ith basis for each
         #  sample
@@ -48,46 +97,85 @@ class _Cholesky():
 class _QR():
     """Solve the linear equation using qr factorization"""
 
-    def __call__(self, *, basis_values, weight_matrix, data_matrix,
-                 penalty_matrix, **_):
+    def __call__(self, *, estimator, basis_values, weight_matrix,
+                 data_matrix, penalty_matrix, **_):
 
         if weight_matrix is not None:
             # Decompose W in U'U and calculate UW and Uy
-            upper = scipy.linalg.cholesky(weight_matrix)
+            upper = estimator._weight_upper()
             basis_values = upper @ basis_values
             data_matrix = upper @ data_matrix
 
-        if not np.all(penalty_matrix == 0):
-            w, v = np.linalg.eigh(penalty_matrix)
-
-            w = w[::-1]
-            v = v[:, ::-1]
-
-            w = np.maximum(w, 0)
-
-            penalty_matrix = v @ np.diag(np.sqrt(w))
+        if penalty_matrix is not None and np.any(penalty_matrix):
+            try:
+                # Any L with L @ L.T equal to the penalty is a valid square
+                # root, and the Cholesky factor is the cheapest one
+                penalty_matrix = scipy.linalg.cholesky(
+                    penalty_matrix, lower=True, check_finite=False)
+            except np.linalg.LinAlgError:
+                # Differential penalties are usually singular
+                w, v = scipy.linalg.eigh(penalty_matrix, check_finite=False)
+
+                # The null space of the penalty adds only zero rows, so only
+                # the eigenvectors with positive eigenvalues are kept
+                positive = w > 0
+                penalty_matrix = v[:, positive] * np.sqrt(w[positive])
+
+            penalty_matrix = penalty_matrix.astype(basis_values.dtype,
+                                                   copy=False)
             # Augment the basis matrix with the square root of the
             # penalty matrix
             basis_values = np.concatenate([
                 basis_values,
                 penalty_matrix.T],
                 axis=0)
-            # Augment data matrix by n zeros
-            data_matrix = np.pad(data_matrix,
-                                 ((0, len(v)),
-                                  (0, 0)),
-                                 mode='constant')
 
         # Resolves the equation
         # B.T @ B @ C = B.T @ D
         # by means of the QR decomposition
+        # The basis values are not overwritten, as they can be the cached
+        # evaluation of the basis. The data matrix is augmented with as
+        # many zero rows as the rank of the penalty.
+        n_points = len(data_matrix)
+        n_basis = basis_values.shape[1]
+
+        if data_matrix.shape[1] < n_basis:
+            # With fewer samples than basis functions it is cheaper to apply
+            # the Householder reflectors of Q to the data than to form Q
+            (qr, tau), r = scipy.linalg.qr(basis_values, mode='raw',
+                                           check_finite=False)
+
+            if len(basis_values) > n_points:
+                augmented_data = np.zeros(
+                    (len(basis_values), data_matrix.shape[1]),
+                    dtype=np.result_type(basis_values, data_matrix),
+                    order='F')
+                augmented_data[:n_points] = data_matrix
+                data_matrix = augmented_data
+
+            ormqr, = scipy.linalg.get_lapack_funcs(('ormqr',),
+                                                   (qr, data_matrix))
+            _, work, _ = ormqr('L', 'T', qr, tau, data_matrix, lwork=-1)
+            right_matrix, _, info = ormqr('L', 'T', qr, tau, data_matrix,
+                                          lwork=int(work[0]))
+            if info < 0:
+                raise ValueError(f"illegal value in {-info}-th argument of "
+                                 f"internal ormqr")
+
+            r = r[:n_basis]
+            right_matrix = right_matrix[:n_basis]
+
+        else:
+            # B = Q @ R
+            q, r = scipy.linalg.qr(basis_values, mode='economic',
+                                   check_finite=False)
 
-        # B = Q @ R
-        q, r = np.linalg.qr(basis_values)
-        right_matrix = q.T @ data_matrix
+            # The zero rows of the augmented data do not contribute
+            right_matrix = q[:n_points].T @ data_matrix
 
         # R @ C = Q.T @ D
-        coefficients = np.linalg.solve(r, right_matrix)
+        coefficients = scipy.linalg.solve_triangular(
+            r, right_matrix, overwrite_b=True, check_finite=False)
         # The ith column is the coefficients of the ith basis for each
         # sample
         coefficients = coefficients.T
@@ -98,16 +186,20 @@ class _QR():
 class _Matrix():
     """Solve the linear equation using matrix inversion"""
 
-    def fit(self, estimator, X, y=None):
+    def fit(self, estimator, X, y=None, *, penalty_matrix=None):
         if estimator.return_basis:
             estimator._cached_coef_matrix = estimator._coef_matrix(
-                estimator.input_points_)
+                estimator.input_points_, penalty_matrix=penalty_matrix)
         else:
             # Force caching the hat matrix
             estimator.hat_matrix()
 
-    def fit_transform(self, estimator, X, y=None):
-        return estimator.fit(X, y).transform(X, y)
+    def fit_transform(self, estimator, X, y=None, *, penalty_matrix=None):
+        # The estimator has already set the fitted points and computed the
+        # penalty, and its basis evaluation is cached, so they are reused
+        # instead of fitting the estimator again
+        self.fit(estimator, X, y, penalty_matrix=penalty_matrix)
+        return self.transform(estimator, X, y)
 
     def __call__(self, *, estimator, **_):
         pass
@@ -123,7 +215,7 @@ class _Matrix():
             return fdatabasis
         else:
             # The matrix is cached
-            return X.copy(data_matrix=self.hat_matrix() @ X.data_matrix,
+            return X.copy(data_matrix=estimator.hat_matrix() @ X.data_matrix,
                           sample_points=estimator.output_points_)
 
 
@@ -326,39 +418,114 @@ class BasisSmoother(_LinearSmoother):
 
         return method_function.value
 
-    def _coef_matrix(self, input_points):
+    def _basis_matrix(self, points, dtype=np.float64):
+        """Evaluate the basis at the points, each basis in a column.
+
+        The result is cached by the contents of the points and the dtype,
+        so that the fit, transform and hat matrix computations share the
+        same evaluation. Only the last evaluations are kept, so a smoother
+        used over many grids does not grow in memory. The returned matrix
+        is read-only.
+
+        """
+        cache = getattr(self, "_evaluated_cache", None)
+        if cache is None or getattr(
+                self, "_evaluated_cache_basis", None) is not self.basis:
+            cache = {}
+            self._evaluated_cache = cache
+            self._evaluated_cache_basis = self.basis
+
+        dtype = np.dtype(dtype)
+        key = (dtype.str,) + tuple(np.asarray(p).tobytes() for p in points)
+        basis_values = cache.get(key)
+        if basis_values is None:
+            basis_values = self.basis.evaluate(
+                _cartesian_product(points)).reshape(
+                (self.basis.n_basis, -1)).T.astype(dtype, copy=False)
+            basis_values.flags.writeable = False
+            if len(cache) >= _BASIS_MATRIX_CACHE_SIZE:
+                # Dictionaries keep insertion order: evict the oldest
+                del cache[next(iter(cache))]
+            cache[key] = basis_values
+
+        return basis_values
+
+    def _weight_upper(self):
+        """Upper Cholesky factor of the weight matrix.
+
+        The factor is cached while the weights object does not change.
+
+        """
+        if getattr(self, "_weight_upper_weights", None) is not self.weights:
+            self._weight_upper_cached = scipy.linalg.cholesky(
+                self.weights, check_finite=False)
+            self._weight_upper_weights = self.weights
+
+        return self._weight_upper_cached
+
+    def _tensor_gram_matrix(self, points):
+        r"""Compute :math:`\Phi' \Phi` using the tensor structure.
+
+        For a :class:`Tensor` basis evaluated in a grid, :math:`\Phi` is the
+        Kronecker product of the evaluations of the univariate bases in
+        each axis, and so is :math:`\Phi' \Phi` of their cross products.
+        Returns ``None`` if the basis is not a tensor basis.
+
+        """
+        if (not isinstance(self.basis, Tensor)
+                or len(points) != self.basis.dim_domain):
+            return None
+
+        gram = np.ones((1, 1))
+        for basis, axis_points in zip(self.basis.basis_list, points):
+            basis_values = basis.evaluate(axis_points).reshape(
+                (basis.n_basis, -1))
+            gram = np.kron(gram, basis_values @ basis_values.T)
+
+        return gram
+
+    def _coef_matrix(self, input_points, *, penalty_matrix=None):
         """Get the matrix that gives the coefficients"""
         from ...misc.regularization import compute_penalty_matrix
 
-        basis_values_input = self.basis.evaluate(
-            _cartesian_product(input_points)).reshape(
-            (self.basis.n_basis, -1)).T
+        basis_values_input = self._basis_matrix(input_points)
 
         # If no weight matrix is given all the weights are one
         if self.weights is not None:
             ols_matrix = (basis_values_input.T @ self.weights
                           @ basis_values_input)
         else:
-            ols_matrix = basis_values_input.T @ basis_values_input
+            ols_matrix = self._tensor_gram_matrix(input_points)
+            if ols_matrix is None:
+                ols_matrix = basis_values_input.T @ basis_values_input
 
-        penalty_matrix = compute_penalty_matrix(
-            basis_iterable=(self.basis,),
-            regularization_parameter=self.smoothing_parameter,
-            regularization=self.regularization)
+        if penalty_matrix is None:
+            penalty_matrix = compute_penalty_matrix(
+                basis_iterable=(self.basis,),
+                regularization_parameter=self.smoothing_parameter,
+                regularization=self.regularization)
 
         ols_matrix += penalty_matrix
 
         right_side = basis_values_input.T
         if self.weights is not None:
-            right_side @= self.weights
+            right_side = right_side @ self.weights
+
+        # The matrix is symmetric positive definite, unless the penalty
+        # makes it singular, so Cholesky is tried first. The right side is
+        # not overwritten, as it can be a view of the cached basis values.
+        try:
+            factor = scipy.linalg.cho_factor(
+                ols_matrix, lower=True, check_finite=False)
+        except np.linalg.LinAlgError:
+            return scipy.linalg.lu_solve(
+                scipy.linalg.lu_factor(ols_matrix, check_finite=False),
+                right_side, check_finite=False)
 
-        return np.linalg.solve(
-            ols_matrix, right_side)
+        return scipy.linalg.cho_solve(factor, right_side, check_finite=False)
 
     def _hat_matrix(self, input_points, output_points):
-        basis_values_output = self.basis.evaluate(_cartesian_product(
-            output_points)).reshape(
-            (self.basis.n_basis, -1)).T
+        basis_values_output = self._basis_matrix(output_points)
 
         return basis_values_output @ self._coef_matrix(input_points)
 
@@ -378,6 +545,8 @@ class BasisSmoother(_LinearSmoother):
         self.output_points_ = (self.output_points
                                if self.output_points is not None
                                else self.input_points_)
+        self._evaluated_cache = None
+        self._cholesky_cached = None
 
         method = self._method_function()
         method_fit = getattr(method, "fit", None)
@@ -413,13 +582,17 @@ class BasisSmoother(_LinearSmoother):
         # m is the observations
         # k is the number of elements of the basis
 
-        # Each sample in a column (m x n)
+        # Each sample in a column (m x n). The transpose is a Fortran
+        # ordered view, which the matrix products pass to BLAS as a
+        # transposed operand, so the data is never copied
         data_matrix = X.data_matrix.reshape((X.n_samples, -1)).T
 
+        # Single precision data is smoothed in single precision, so that
+        # the solvers use the single precision LAPACK routines
+        dtype = np.result_type(data_matrix, np.float32)
+
         # Each basis in a column
-        basis_values = self.basis.evaluate(
-            _cartesian_product(self.input_points_)).reshape(
-            (self.basis.n_basis, -1)).T
+        basis_values = self._basis_matrix(self.input_points_, dtype=dtype)
 
         # If no weight matrix is given all the weights are one
         weight_matrix = self.weights
@@ -441,7 +614,8 @@ class BasisSmoother(_LinearSmoother):
             # If the method provides the complete transformation use it
             method_fit_transform = getattr(method, "fit_transform", None)
             if method_fit_transform is not None:
-                return method_fit_transform(estimator=self, X=X, y=y)
+                return method_fit_transform(estimator=self, X=X, y=y,
+                                            penalty_matrix=penalty_matrix)
 
             # Otherwise the method is used to compute the coefficients
             coefficients = method(estimator=self,
@@ -483,8 +657,9 @@ class BasisSmoother(_LinearSmoother):
 
         """
 
-        assert all([all(i == s)
-                    for i, s in zip(self.input_points_, X.sample_points)])
+        assert (len(self.input_points_) == len(X.sample_points)
+                and all(np.array_equal(i, s) for i, s
+                        in zip(self.input_points_, X.sample_points)))
 
         method = self._method_function()
 
@@ -4,6 +4,45 @@ from ..._utils import _list_of_arrays
 from ..._utils import _same_domain
 from ._basis import Basis
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# Minimum number of values (basis functions times points) for which the
+# compiled evaluation is used, so that small evaluations do not pay the
+# thread start-up cost. With a single thread the vectorized NumPy sin and
+# cos are faster, so the compiled evaluation is only used in parallel.
+_NUMBA_MIN_SIZE = 2 ** 16
+
+
+if numba is not None:
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _evaluate_numba(eval_points, n_basis, period):
+        """Compiled evaluation of the Fourier basis.
+
+        The angles, sines, cosines and normalization are computed in a
+        single pass over the points, with the frequencies in parallel so
+        that each thread writes contiguous rows.
+
+        """
+        n_points = eval_points.shape[0]
+        omega = 2 * np.pi / period
+        normalization = 1 / np.sqrt(period / 2)
+
+        res = np.empty((n_basis, n_points))
+        res[0] = normalization / np.sqrt(2)
+
+        for j in numba.prange(1, (n_basis - 1) // 2 + 1):
+            for k in range(n_points):
+                angle = omega * j * eval_points[k]
+                res[2 * j - 1, k] = np.sin(angle) * normalization
+                res[2 * j, k] = np.cos(angle) * normalization
+
+        return res
+
 
 class Fourier(Basis):
     r"""Fourier basis.
@@ -107,63 +146,84 @@ class Fourier(Basis):
     def period(self, value):
         self._period = value
 
-    def _evaluate(self, eval_points):
-
-        # Input is scalar
-        eval_points = eval_points[..., 0]
+    def _frequencies(self):
+        """Angular frequencies and normalization of the basis.
 
-        functions = [np.sin, np.cos]
-        omega = 2 * np.pi / self.period
+        They do not depend on the evaluation points, so they are cached
+        while the period and number of basis do not change.
 
-        normalization_denominator = np.sqrt(self.period / 2)
+        """
+        key = (self.period, self.n_basis)
+        cached = getattr(self, "_frequencies_cached", None)
+        if cached is None or cached[0] != key:
+            omega = 2 * np.pi / self.period
+            seq = 1 + np.arange((self.n_basis - 1) // 2)
+            cached = (key, omega * seq, np.sqrt(self.period / 2))
+            self._frequencies_cached = cached
 
-        seq = 1 + np.arange((self.n_basis - 1) // 2)
-        seq_pairs = np.array([seq, seq]).T
-        phase_coefs = omega * seq_pairs
+        return cached[1:]
 
-        # Multiply the phase coefficients elementwise
-        res = np.einsum('ij,k->ijk', phase_coefs, eval_points)
+    def _evaluate(self, eval_points):
 
-        # Apply odd and even functions
-        for i in [0, 1]:
-            functions[i](res[:, i, :], out=res[:, i, :])
+        # Input is scalar
+        eval_points = eval_points[..., 0]
 
-        res = res.reshape(-1, len(eval_points))
-        res /= normalization_denominator
+        if (numba is not None and numba.get_num_threads() > 1
+                and self.n_basis * len(eval_points) >= _NUMBA_MIN_SIZE):
+            return _evaluate_numba(
+                np.ascontiguousarray(eval_points, dtype=float),
+                self.n_basis, float(self.period))
 
-        constant_basis = np.full(
-            shape=(1, len(eval_points)),
-            fill_value=1 / (np.sqrt(2) * normalization_denominator))
+        frequencies, normalization_denominator = self._frequencies()
+        angles = np.outer(frequencies, eval_points)
 
-        res = np.concatenate((constant_basis, res))
+        # The sine and cosine of each frequency are interleaved after the
+        # constant basis
+        res = np.empty((self.n_basis, len(eval_points)))
+        res[0] = 1 / (np.sqrt(2) * normalization_denominator)
+        np.sin(angles, out=res[1::2])
+        np.cos(angles, out=res[2::2])
+        res[1:] /= normalization_denominator
 
         return res
 
     def _derivative_basis_and_coefs(self, coefs, order=1):
 
-        omega = 2 * np.pi / self.period
-        deriv_factor = (np.arange(1, (self.n_basis + 1) / 2) * omega) ** order
-
-        deriv_coefs = np.zeros(coefs.shape)
+        frequencies, _ = self._frequencies()
+        deriv_factor = frequencies ** order
 
         cos_sign, sin_sign = ((-1) ** int((order + 1) / 2),
                               (-1) ** int(order / 2))
 
+        # Coefficients of the sine and cosine of each frequency
+        pairs = coefs[:, 1:].reshape((len(coefs), -1, 2))
+
+        # Odd derivatives swap the sines and the cosines
         if order % 2 == 0:
-            deriv_coefs[:, 1::2] = sin_sign * coefs[:, 1::2] * deriv_factor
-            deriv_coefs[:, 2::2] = cos_sign * coefs[:, 2::2] * deriv_factor
+            signs = [sin_sign, cos_sign]
         else:
-            deriv_coefs[:, 2::2] = sin_sign * coefs[:, 1::2] * deriv_factor
-            deriv_coefs[:, 1::2] = cos_sign * coefs[:, 2::2] * deriv_factor
+            pairs = pairs[..., ::-1]
+            signs = [cos_sign, sin_sign]
+
+        deriv_coefs = np.empty(coefs.shape)
+        deriv_coefs[:, 0] = 0
+        deriv_coefs[:, 1:] = (
+            pairs * (deriv_factor[:, np.newaxis] * signs)).reshape(
+            (len(coefs), -1))
 
         # normalise
         return self.copy(), deriv_coefs
 
     def _gram_matrix(self):
 
-        # Orthogonal in this case
-        if self.period == (self.domain_range[0][1] - self.domain_range[0][0]):
-            return np.identity(self.n_basis)
+        # Orthogonal if the domain spans a whole number of periods, and
+        # each function has norm one per period
+        n_periods = ((self.domain_range[0][1] - self.domain_range[0][0])
+                     / self.period)
+        rounded_periods = np.round(n_periods)
+        if rounded_periods >= 1 and np.isclose(
+                n_periods, rounded_periods, rtol=1e-12, atol=0):
+            return rounded_periods * np.identity(self.n_basis)
         else:
             return super()._gram_matrix()
 
@@ -1,3 +1,4 @@
+import functools
 import itertools
 
 import numpy as np
@@ -96,17 +97,19 @@ class Tensor(Basis):
 
     def _gram_matrix(self):
 
-        gram_matrices = [b.gram_matrix().ravel() for b in self.basis_list]
-
-        gram = gram_matrices[0]
-
-        for g in gram_matrices[1:]:
-            gram = np.outer(gram, g).ravel()
-
-        return gram.reshape((self.n_basis, self.n_basis))
+        # The inner product of tensor functions factorizes over the axes
+        return functools.reduce(
+            np.kron, [b.gram_matrix() for b in self.basis_list])
 
     def basis_of_product(self, other):
         pass
 
     def rbasis_of_product(self, other):
         pass
+
+    def __eq__(self, other):
+        """Equality of Basis"""
+        return (super().__eq__(other)
+                and len(self.basis_list) == len(other.basis_list)
+                and all(b1 == b2 for b1, b2
+                        in zip(self.basis_list, other.basis_list)))
@@ -149,3 +149,10 @@ class VectorValued(Basis):
 
     def rbasis_of_product(self, other):
         pass
+
+    def __eq__(self, other):
+        """Equality of Basis"""
+        return (super().__eq__(other)
+                and len(self.basis_list) == len(other.basis_list)
+                and all(b1 == b2 for b1, b2
+                        in zip(self.basis_list, other.basis_list)))
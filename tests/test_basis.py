@@ -2,7 +2,7 @@ from skfda import concatenate
 import skfda
 from skfda.misc import inner_product, inner_product_matrix
 from skfda.representation.basis import (Basis, FDataBasis, Constant, Monomial,
-                                        BSpline, Fourier)
+                                        BSpline, Fourier, Tensor)
 from skfda.representation.grid import FDataGrid
 import unittest
 
@@ -121,6 +121,35 @@ class TestBasis(unittest.TestCase):
         np.testing.assert_allclose(
             gram_matrix_numerical, gram_matrix_res, atol=1e-15, rtol=1e-15)
 
+    def test_basis_gram_matrix_fourier_periods(self):
+
+        basis = Fourier((1, 3), n_basis=5, period=0.5)
+        gram_matrix = basis.gram_matrix()
+        gram_matrix_numerical = basis._gram_matrix_numerical()
+
+        np.testing.assert_allclose(gram_matrix, 4 * np.identity(5))
+        np.testing.assert_allclose(
+            gram_matrix_numerical, gram_matrix, atol=1e-13)
+
+    def test_basis_gram_matrix_tensor(self):
+
+        basis = Tensor([Monomial((0, 1), n_basis=2),
+                        Fourier((0, 2), n_basis=3, period=1)])
+        gram_matrix = basis.gram_matrix()
+        gram_matrix_numerical = basis._gram_matrix_numerical()
+
+        np.testing.assert_allclose(
+            gram_matrix, gram_matrix_numerical, atol=1e-13)
+
+    def test_basis_tensor_equality(self):
+
+        monomial = Monomial(n_basis=3)
+
+        self.assertEqual(Tensor([Monomial(n_basis=2), monomial]),
+                         Tensor([Monomial(n_basis=2), monomial.copy()]))
+        self.assertNotEqual(Tensor([Monomial(n_basis=2), monomial]),
+                            Tensor([monomial, Monomial(n_basis=2)]))
+
     def test_basis_gram_matrix_bspline(self):
 
         basis = BSpline(n_basis=6)
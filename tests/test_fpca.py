@@ -1,7 +1,8 @@
 from skfda import FDataGrid, FDataBasis
 from skfda.datasets import fetch_weather
 from skfda.misc.operators import LinearDifferentialOperator
-from skfda.misc.regularization import TikhonovRegularization
+from skfda.misc.regularization import (TikhonovRegularization,
+                                       L2Regularization)
 from skfda.preprocessing.dim_reduction.projection import FPCA
 from skfda.representation.basis import Fourier
 import unittest
@@ -46,6 +47,66 @@ class FPCATestCase(unittest.TestCase):
         with self.assertRaises(AttributeError):
             fpca.fit(fd)
 
+    def test_grid_fpca_weights(self):
+        sample_points = np.linspace(0, 1, 5)
+        fd = FDataGrid([[1, 2, 3, 2, 1], [0, 1, 0, 1, 0], [2, 1, 2, 1, 2]],
+                       sample_points=sample_points)
+
+        # the trapezoidal weights are not stored in the weights parameter
+        fpca = FPCA(n_components=2)
+        fpca.fit(fd)
+        self.assertIsNone(fpca.weights)
+
+        fpca_weights = FPCA(n_components=2,
+                            weights=np.array([1, 2, 2, 2, 1]) / 8)
+        fpca_weights.fit(fd)
+        np.testing.assert_allclose(
+            np.abs(fpca.components_.data_matrix),
+            np.abs(fpca_weights.components_.data_matrix))
+
+    def test_grid_fpca_single_precision(self):
+        sample_points = np.linspace(0, 1, 30)
+        random_state = np.random.RandomState(0)
+        data_matrix = random_state.randn(20, 30).cumsum(axis=1)
+
+        fpca = FPCA(n_components=2)
+        fpca.fit(FDataGrid(data_matrix, sample_points=sample_points))
+
+        fd_single = FDataGrid(data_matrix.astype(np.float32),
+                              sample_points=sample_points)
+        fpca_single = FPCA(n_components=2)
+        fpca_single.fit(fd_single)
+
+        self.assertEqual(fpca_single.components_.data_matrix.dtype,
+                         np.float32)
+        self.assertEqual(fpca_single.transform(fd_single).dtype, np.float32)
+        np.testing.assert_allclose(fpca_single.explained_variance_,
+                                   fpca.explained_variance_, rtol=1e-4)
+
+    def test_fpca_regularization_sequence(self):
+        sample_points = np.linspace(0, 1, 30)
+        random_state = np.random.RandomState(0)
+        fd = FDataGrid(random_state.randn(20, 30).cumsum(axis=1),
+                       sample_points=sample_points)
+        fd_basis = fd.to_basis(Fourier(n_basis=7))
+
+        # The estimator keeps the last penalty matrix, which must not be
+        # reused for another kind of operator
+        for data in (fd, fd_basis):
+            with self.subTest(data=type(data).__name__):
+                fpca_l2 = FPCA(n_components=2,
+                               regularization=L2Regularization())
+                fpca_l2.fit(data)
+
+                fpca = FPCA(n_components=2,
+                            regularization=TikhonovRegularization(
+                                LinearDifferentialOperator(2)))
+                fpca.fit(data)
+                fpca.set_params(regularization=L2Regularization())
+                fpca.fit(data)
+                np.testing.assert_allclose(fpca.explained_variance_,
+                                           fpca_l2.explained_variance_)
+
     def test_basis_fpca_fit_result(self):
 
         n_basis = 9
@@ -1,4 +1,5 @@
 import skfda
+from skfda._utils import _pairwise_commutative, _to_array_maybe_ragged
 from skfda.representation.basis import Monomial, Tensor, VectorValued
 import unittest
 import numpy as np
@@ -70,6 +71,46 @@ class InnerProductTest(unittest.TestCase):
             skfda.misc.inner_product(fd_basis, fd_basis), res, rtol=1e-5)
 
 
+def _euclidean(arg1, arg2):
+    return np.sqrt(np.sum((arg1 - arg2) ** 2, axis=-1))
+
+
+class PairwiseTest(unittest.TestCase):
+
+    def setUp(self):
+        random_state = np.random.RandomState(0)
+        self.arg1 = random_state.randn(6, 4)
+        self.arg2 = random_state.randn(3, 4)
+
+    def test_broadcasts(self):
+        np.testing.assert_allclose(
+            _pairwise_commutative(_euclidean, self.arg1, self.arg2,
+                                  broadcasts=True),
+            _pairwise_commutative(_euclidean, self.arg1, self.arg2))
+
+
+class ToArrayMaybeRaggedTest(unittest.TestCase):
+
+    def test_ragged_copies_rows(self):
+        rows = [np.arange(3.), np.arange(2.)]
+
+        res = _to_array_maybe_ragged(rows, row_shape=(-1, 1))
+        res[0][0] = 10
+
+        self.assertEqual(res.dtype, np.object_)
+        self.assertEqual(res[1].shape, (2, 1))
+        np.testing.assert_array_equal(rows[0], [0, 1, 2])
+
+    def test_equal_length(self):
+        rows = [np.arange(3.), [3, 4, 5]]
+
+        res = _to_array_maybe_ragged(rows)
+        res[0, 0] = 10
+
+        np.testing.assert_array_equal(res, [[10, 1, 2], [3, 4, 5]])
+        np.testing.assert_array_equal(rows[0], [0, 1, 2])
+
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
@@ -1,6 +1,9 @@
 from skfda.datasets import fetch_gait
 from skfda.inference.anova import oneway_anova, v_asymptotic_stat, \
     v_sample_stat
+from skfda.inference.anova.anova_oneway import (_anova_bootstrap_setup,
+                                                _uniform_simpson_weights,
+                                                _weighted_gram)
 from skfda.representation import FDataGrid
 from skfda.representation.basis import Fourier
 import unittest
@@ -49,6 +52,78 @@ class OnewayAnovaTests(unittest.TestCase):
         self.assertAlmostEqual(v_asymptotic_stat(fd.to_basis(Fourier(
             n_basis=5)), weights), res)
 
+    def test_n_jobs(self):
+        t = np.linspace(0, 1, 20)
+        random_state = np.random.RandomState(0)
+        fd1 = FDataGrid(random_state.randn(5, 20), sample_points=t)
+        fd2 = FDataGrid(random_state.randn(6, 20), sample_points=t)
+
+        vn, p_value, dist = oneway_anova(fd1, fd2, n_reps=50,
+                                         random_state=0, return_dist=True)
+
+        # The result does not depend on the number of jobs
+        for n_jobs in (2, 3):
+            vn_par, p_value_par, dist_par = oneway_anova(
+                fd1, fd2, n_reps=50, random_state=0, n_jobs=n_jobs,
+                return_dist=True)
+            self.assertEqual(vn, vn_par)
+            self.assertEqual(p_value, p_value_par)
+            np.testing.assert_allclose(dist_par, dist, rtol=1e-12)
+
+    def test_early_stop(self):
+        t = np.linspace(0, 1, 20)
+        random_state = np.random.RandomState(0)
+        fd1 = FDataGrid(random_state.randn(5, 20), sample_points=t)
+        fd2 = FDataGrid(random_state.randn(6, 20) + 10, sample_points=t)
+
+        _, p_value, dist = oneway_anova(fd1, fd2, n_reps=2000,
+                                        random_state=0, early_stop=True,
+                                        return_dist=True)
+        self.assertEqual(p_value, 0)
+        self.assertLess(len(dist), 2000)
+
+    def test_random_generator(self):
+        t = np.linspace(0, 1, 20)
+        random_state = np.random.RandomState(0)
+        fd1 = FDataGrid(random_state.randn(5, 20), sample_points=t)
+        fd2 = FDataGrid(random_state.randn(6, 20), sample_points=t)
+
+        for n_jobs in (1, 2):
+            _, p_value, dist = oneway_anova(
+                fd1, fd2, n_reps=50, random_state=np.random.default_rng(0),
+                n_jobs=n_jobs, return_dist=True)
+            _, p_value2, dist2 = oneway_anova(
+                fd1, fd2, n_reps=50, random_state=np.random.default_rng(0),
+                n_jobs=n_jobs, return_dist=True)
+            self.assertEqual(p_value, p_value2)
+            np.testing.assert_array_equal(dist, dist2)
+
+        _, _, dist = oneway_anova(fd1, fd2, n_reps=50,
+                                  random_state=np.random.default_rng(0),
+                                  return_dist=True, dtype=np.float32)
+        self.assertEqual(dist.shape, (50,))
+
+    def test_single_precision(self):
+        t = np.linspace(0, 1, 20)
+        random_state = np.random.RandomState(0)
+        fd_groups = [FDataGrid(random_state.randn(5, 20), sample_points=t)
+                     for _ in range(3)]
+
+        # The gaussian processes are simulated in single precision
+        factors, _, _ = _anova_bootstrap_setup(fd_groups, dtype=np.float32)
+        self.assertEqual(factors.dtype, np.float32)
+
+        # and the weights do not promote them to double precision
+        data = random_state.randn(4, 3, 20).astype(np.float32)
+        self.assertEqual(
+            _weighted_gram(data, _uniform_simpson_weights(20)).dtype,
+            np.float32)
+
+        # The statistics are accumulated in double precision
+        _, _, dist = oneway_anova(*fd_groups, n_reps=50, random_state=0,
+                                  return_dist=True, dtype=np.float32)
+        self.assertEqual(dist.dtype, np.float64)
+
     def test_asymptotic_behaviour(self):
         dataset = fetch_gait()
         fd = dataset['data'].coordinates[1]
@@ -8,48 +8,105 @@ import unittest
 import numpy as np
 
 
+# Response of the single explanatory tests: the inner products of the
+# monomials with the sum of the first five Fourier functions
+_SINGLE_EXPLANATORY_Y = np.array([0.9999999999999993, 0.162381381441085,
+                                  0.08527083481359901, 0.08519946930844623,
+                                  0.09532291032042489, 0.10550022969639987,
+                                  0.11382675064746171])
+
+# Reference results of the regression tests
+_EXPECTED_MULTI_INTERCEPT = np.array([32.65])
+_EXPECTED_MULTI_COEF = np.array([[-28.6443, 80.3996, -188.587, 236.5832,
+                                  -481.3449]])
+_EXPECTED_MIXED_REG_COEF_MULTIVARIATE = np.array([2.536739, 1.072186])
+_EXPECTED_MIXED_REG_COEF_FUNCTIONAL = np.array([[2.125676, 2.450782,
+                                                 5.808745e-4]])
+_EXPECTED_MIXED_REG_YPRED = np.array([5.349035, 16.456464, 13.361185,
+                                      23.930295, 32.650965, 23.961766,
+                                      16.29029])
+_EXPECTED_REG_YPRED = np.array([0.890341, 0.370162, 0.196773, 0.110079,
+                                0.058063, 0.023385, -0.001384])
+
+
 class TestScalarLinearRegression(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        # Data and bases shared by several tests. The tests only read them,
+        # so the Gram matrices cached by the bases are computed once.
+        cls.x_fd = FDataBasis(Monomial(n_basis=7), np.identity(7))
+        cls.x_fd.coefficients.flags.writeable = False
+        cls.fourier_basis = Fourier(n_basis=5)
+
+        # Mixed multivariate and functional data, with response
+        # y = 2 + sum([3, 1] * array) + int(3 * function)
+        cls.mixed_intercept = 2
+        cls.mixed_coefs_multivariate = np.array([3, 1])
+        cls.mixed_multivariate = np.array([[0, 0], [2, 7], [1, 7], [3, 9],
+                                           [4, 16], [2, 14], [3, 5]])
+        cls.mixed_fd = FDataBasis(Monomial(n_basis=3),
+                                  [[1, 0, 0], [0, 1, 0], [0, 0, 1],
+                                   [1, 0, 1], [1, 0, 0], [0, 1, 0],
+                                   [0, 0, 1]])
+        y_integral = np.array([3, 3 / 2, 1, 4, 3, 3 / 2, 1])
+        y_sum = cls.mixed_multivariate @ cls.mixed_coefs_multivariate
+        cls.mixed_y = cls.mixed_intercept + y_sum + y_integral
+
+        for array in (cls.mixed_coefs_multivariate, cls.mixed_multivariate,
+                      cls.mixed_fd.coefficients, cls.mixed_y):
+            array.flags.writeable = False
+
     def test_regression_single_explanatory(self):
 
-        x_basis = Monomial(n_basis=7)
-        x_fd = FDataBasis(x_basis, np.identity(7))
+        x_fd = self.x_fd
 
-        beta_basis = Fourier(n_basis=5)
+        beta_basis = self.fourier_basis
         beta_fd = FDataBasis(beta_basis, [1, 1, 1, 1, 1])
-        y = [0.9999999999999993,
-             0.162381381441085,
-             0.08527083481359901,
-             0.08519946930844623,
-             0.09532291032042489,
-             0.10550022969639987,
-             0.11382675064746171]
+        y = _SINGLE_EXPLANATORY_Y
 
         scalar = LinearRegression(coef_basis=[beta_basis])
         scalar.fit(x_fd, y)
         np.testing.assert_allclose(scalar.coef_[0].coefficients,
                                    beta_fd.coefficients)
-        np.testing.assert_allclose(scalar.intercept_,
-                                   0.0, atol=1e-6)
+        self.assertAlmostEqual(float(scalar.intercept_), 0.0, delta=1e-6)
 
         y_pred = scalar.predict(x_fd)
         np.testing.assert_allclose(y_pred, y)
 
-        scalar = LinearRegression(coef_basis=[beta_basis],
-                                  fit_intercept=False)
+        # Same coefficients and no intercept, so the predictions are the
+        # ones already checked
+        scalar.set_params(fit_intercept=False)
         scalar.fit(x_fd, y)
         np.testing.assert_allclose(scalar.coef_[0].coefficients,
                                    beta_fd.coefficients)
-        np.testing.assert_equal(scalar.intercept_,
-                                0.0)
+        self.assertEqual(scalar.intercept_, 0.0)
 
-        y_pred = scalar.predict(x_fd)
-        np.testing.assert_allclose(y_pred, y)
+    def test_regression_single_explanatory_float32(self):
+
+        x_fd = FDataBasis(self.x_fd.basis, np.identity(7, dtype=np.float32))
+
+        beta_basis = self.fourier_basis
+        beta_fd = FDataBasis(beta_basis, [1, 1, 1, 1, 1])
+        y = _SINGLE_EXPLANATORY_Y.astype(np.float32)
+
+        for fit_intercept in (True, False):
+            with self.subTest(fit_intercept=fit_intercept):
+                scalar = LinearRegression(coef_basis=[beta_basis],
+                                          fit_intercept=fit_intercept)
+                scalar.fit(x_fd, y)
+                np.testing.assert_allclose(scalar.coef_[0].coefficients,
+                                           beta_fd.coefficients, atol=1e-4)
+                self.assertAlmostEqual(float(scalar.intercept_), 0.0,
+                                       delta=1e-4)
+
+                y_pred = scalar.predict(x_fd)
+                np.testing.assert_allclose(y_pred, y, atol=1e-4)
 
     def test_regression_multiple_explanatory(self):
         y = [1, 2, 3, 4, 5, 6, 7]
 
-        X = FDataBasis(Monomial(n_basis=7), np.identity(7))
+        X = self.x_fd
 
         beta1 = BSpline(domain_range=(0, 1), n_basis=5)
 
@@ -57,44 +114,32 @@ class TestScalarLinearRegression(unittest.TestCase):
 
         scalar.fit(X, y)
 
-        np.testing.assert_allclose(scalar.intercept_.round(4),
-                                   np.array([32.65]), rtol=1e-3)
+        np.testing.assert_allclose(scalar.intercept_,
+                                   _EXPECTED_MULTI_INTERCEPT,
+                                   rtol=1e-3, atol=5e-5)
 
         np.testing.assert_allclose(
-            scalar.coef_[0].coefficients.round(4),
-            np.array([[-28.6443,
-                       80.3996,
-                       -188.587,
-                       236.5832,
-                       -481.3449]]), rtol=1e-3)
+            scalar.coef_[0].coefficients,
+            _EXPECTED_MULTI_COEF, rtol=1e-3, atol=5e-5)
 
         y_pred = scalar.predict(X)
         np.testing.assert_allclose(y_pred, y, atol=0.01)
 
     def test_regression_mixed(self):
 
-        multivariate = np.array([[0, 0], [2, 7], [1, 7], [3, 9],
-                                 [4, 16], [2, 14], [3, 5]])
-
-        X = [multivariate,
-             FDataBasis(Monomial(n_basis=3), [[1, 0, 0], [0, 1, 0], [0, 0, 1],
-                                              [1, 0, 1], [1, 0, 0], [0, 1, 0],
-                                              [0, 0, 1]])]
+        X = [self.mixed_multivariate, self.mixed_fd]
+        y = self.mixed_y
 
-        # y = 2 + sum([3, 1] * array) + int(3 * function)
-        intercept = 2
-        coefs_multivariate = np.array([3, 1])
+        intercept = self.mixed_intercept
+        coefs_multivariate = self.mixed_coefs_multivariate
         coefs_functions = FDataBasis(
             Monomial(n_basis=3), [[3, 0, 0]])
-        y_integral = np.array([3, 3 / 2, 1, 4, 3, 3 / 2, 1])
-        y_sum = multivariate @ coefs_multivariate
-        y = 2 + y_sum + y_integral
 
         scalar = LinearRegression()
         scalar.fit(X, y)
 
-        np.testing.assert_allclose(scalar.intercept_,
-                                   intercept, atol=0.01)
+        self.assertAlmostEqual(float(scalar.intercept_), intercept,
+                               delta=0.01)
 
         np.testing.assert_allclose(
             scalar.coef_[0],
@@ -109,20 +154,10 @@ class TestScalarLinearRegression(unittest.TestCase):
 
     def test_regression_mixed_regularization(self):
 
-        multivariate = np.array([[0, 0], [2, 7], [1, 7], [3, 9],
-                                 [4, 16], [2, 14], [3, 5]])
-
-        X = [multivariate,
-             FDataBasis(Monomial(n_basis=3), [[1, 0, 0], [0, 1, 0], [0, 0, 1],
-                                              [1, 0, 1], [1, 0, 0], [0, 1, 0],
-                                              [0, 0, 1]])]
+        X = [self.mixed_multivariate, self.mixed_fd]
+        y = self.mixed_y
 
-        # y = 2 + sum([3, 1] * array) + int(3 * function)
-        intercept = 2
-        coefs_multivariate = np.array([3, 1])
-        y_integral = np.array([3, 3 / 2, 1, 4, 3, 3 / 2, 1])
-        y_sum = multivariate @ coefs_multivariate
-        y = 2 + y_sum + y_integral
+        intercept = self.mixed_intercept
 
         scalar = LinearRegression(
             regularization=[TikhonovRegularization(lambda x: x),
@@ -130,30 +165,26 @@ class TestScalarLinearRegression(unittest.TestCase):
                                 LinearDifferentialOperator(2))])
         scalar.fit(X, y)
 
-        np.testing.assert_allclose(scalar.intercept_,
-                                   intercept, atol=0.01)
+        self.assertAlmostEqual(float(scalar.intercept_), intercept,
+                               delta=0.01)
 
         np.testing.assert_allclose(
             scalar.coef_[0],
-            [2.536739, 1.072186], atol=0.01)
+            _EXPECTED_MIXED_REG_COEF_MULTIVARIATE, atol=0.01)
 
         np.testing.assert_allclose(
             scalar.coef_[1].coefficients,
-            [[2.125676, 2.450782, 5.808745e-4]], atol=0.01)
+            _EXPECTED_MIXED_REG_COEF_FUNCTIONAL, atol=0.01)
 
         y_pred = scalar.predict(X)
         np.testing.assert_allclose(
-            y_pred,
-            [5.349035, 16.456464, 13.361185, 23.930295,
-                32.650965, 23.961766, 16.29029],
-            atol=0.01)
+            y_pred, _EXPECTED_MIXED_REG_YPRED, atol=0.01)
 
     def test_regression_regularization(self):
 
-        x_basis = Monomial(n_basis=7)
-        x_fd = FDataBasis(x_basis, np.identity(7))
+        x_fd = self.x_fd
 
-        beta_basis = Fourier(n_basis=5)
+        beta_basis = self.fourier_basis
         beta_fd = FDataBasis(beta_basis, [1.0403, 0, 0, 0, 0])
         y = [1.0000684777229512,
              0.1623672257830915,
@@ -163,14 +194,6 @@ class TestScalarLinearRegression(unittest.TestCase):
              0.10549625973303875,
              0.11384314859153018]
 
-        y_pred_compare = [0.890341,
-                          0.370162,
-                          0.196773,
-                          0.110079,
-                          0.058063,
-                          0.023385,
-                          -0.001384]
-
         scalar = LinearRegression(
             coef_basis=[beta_basis],
             regularization=TikhonovRegularization(
@@ -178,11 +201,10 @@ class TestScalarLinearRegression(unittest.TestCase):
         scalar.fit(x_fd, y)
         np.testing.assert_allclose(scalar.coef_[0].coefficients,
                                    beta_fd.coefficients, atol=1e-3)
-        np.testing.assert_allclose(scalar.intercept_,
-                                   -0.15, atol=1e-4)
+        self.assertAlmostEqual(float(scalar.intercept_), -0.15, delta=1e-4)
 
         y_pred = scalar.predict(x_fd)
-        np.testing.assert_allclose(y_pred, y_pred_compare, atol=1e-4)
+        np.testing.assert_allclose(y_pred, _EXPECTED_REG_YPRED, atol=1e-4)
 
         x_basis = Monomial(n_basis=3)
         x_fd = FDataBasis(x_basis, [[1, 0, 0],
@@ -198,8 +220,7 @@ class TestScalarLinearRegression(unittest.TestCase):
         scalar.fit(x_fd, y)
         np.testing.assert_allclose(scalar.coef_[0].coefficients,
                                    beta_fd.coefficients)
-        np.testing.assert_allclose(scalar.intercept_,
-                                   1)
+        self.assertAlmostEqual(float(scalar.intercept_), 1, delta=1e-7)
 
         y_pred = scalar.predict(x_fd)
         np.testing.assert_allclose(y_pred, y)
@@ -208,26 +229,26 @@ class TestScalarLinearRegression(unittest.TestCase):
         beta_fd_reg = FDataBasis(x_basis, [2.812, 3.043, 0])
         y_reg = [5.333, 3.419, 2.697, 11.366]
 
-        scalar_reg = LinearRegression(
+        scalar.set_params(
             regularization=TikhonovRegularization(
                 LinearDifferentialOperator(2)))
-        scalar_reg.fit(x_fd, y)
-        np.testing.assert_allclose(scalar_reg.coef_[0].coefficients,
+        scalar.fit(x_fd, y)
+        np.testing.assert_allclose(scalar.coef_[0].coefficients,
                                    beta_fd_reg.coefficients, atol=0.001)
-        np.testing.assert_allclose(scalar_reg.intercept_,
-                                   0.998, atol=0.001)
+        self.assertAlmostEqual(float(scalar.intercept_), 0.998,
+                               delta=0.001)
 
-        y_pred = scalar_reg.predict(x_fd)
+        y_pred = scalar.predict(x_fd)
         np.testing.assert_allclose(y_pred, y_reg, atol=0.001)
 
     def test_error_X_not_FData(self):
         """Tests that at least one of the explanatory variables
         is an FData object. """
 
-        x_fd = np.identity(7)
+        x_fd = self.x_fd.coefficients
         y = np.zeros(7)
 
-        scalar = LinearRegression(coef_basis=[Fourier(n_basis=5)])
+        scalar = LinearRegression(coef_basis=[self.fourier_basis])
 
         with np.testing.assert_warns(UserWarning):
             scalar.fit([x_fd], y)
@@ -235,10 +256,13 @@ class TestScalarLinearRegression(unittest.TestCase):
     def test_error_y_is_FData(self):
         """Tests that none of the explained variables is an FData object
         """
-        x_fd = FDataBasis(Monomial(n_basis=7), np.identity(7))
-        y = list(FDataBasis(Monomial(n_basis=7), np.identity(7)))
+        x_fd = self.x_fd
+        # Object array, so that the response is not converted to a
+        # numeric array by iterating over each element
+        y = np.empty(7, dtype=object)
+        y.fill(self.x_fd[0])
 
-        scalar = LinearRegression(coef_basis=[Fourier(n_basis=5)])
+        scalar = LinearRegression(coef_basis=[self.fourier_basis])
 
         with np.testing.assert_raises(ValueError):
             scalar.fit([x_fd], y)
@@ -247,9 +271,9 @@ class TestScalarLinearRegression(unittest.TestCase):
         """ Test that the number of beta bases and explanatory variables
         are not different """
 
-        x_fd = FDataBasis(Monomial(n_basis=7), np.identity(7))
-        y = [1 for _ in range(7)]
-        beta = Fourier(n_basis=5)
+        x_fd = self.x_fd
+        y = np.ones(7)
+        beta = self.fourier_basis
 
         scalar = LinearRegression(coef_basis=[beta])
         with np.testing.assert_raises(ValueError):
@@ -263,17 +287,17 @@ class TestScalarLinearRegression(unittest.TestCase):
         """ Test that the number of response samples and explanatory samples
         are not different """
 
-        x_fd = FDataBasis(Monomial(n_basis=7), np.identity(7))
-        y = [1 for _ in range(8)]
-        beta = Fourier(n_basis=5)
+        x_fd = self.x_fd
+        y = np.ones(8)
+        beta = self.fourier_basis
 
         scalar = LinearRegression(coef_basis=[beta])
         with np.testing.assert_raises(ValueError):
             scalar.fit([x_fd], y)
 
         x_fd = FDataBasis(Monomial(n_basis=8), np.identity(8))
-        y = [1 for _ in range(7)]
-        beta = Fourier(n_basis=5)
+        y = np.ones(7)
+        beta = self.fourier_basis
 
         scalar = LinearRegression(coef_basis=[beta])
         with np.testing.assert_raises(ValueError):
@@ -282,9 +306,9 @@ class TestScalarLinearRegression(unittest.TestCase):
     def test_error_beta_not_basis(self):
         """ Test that all beta are Basis objects. """
 
-        x_fd = FDataBasis(Monomial(n_basis=7), np.identity(7))
-        y = [1 for _ in range(7)]
-        beta = FDataBasis(Monomial(n_basis=7), np.identity(7))
+        x_fd = self.x_fd
+        y = np.ones(7)
+        beta = self.x_fd
 
         scalar = LinearRegression(coef_basis=[beta])
         with np.testing.assert_raises(TypeError):
@@ -294,10 +318,10 @@ class TestScalarLinearRegression(unittest.TestCase):
         """ Test that the number of weights is equal to the
         number of samples """
 
-        x_fd = FDataBasis(Monomial(n_basis=7), np.identity(7))
-        y = [1 for _ in range(7)]
-        weights = [1 for _ in range(8)]
-        beta = Monomial(n_basis=7)
+        x_fd = self.x_fd
+        y = np.ones(7)
+        weights = np.ones(8)
+        beta = self.x_fd.basis
 
         scalar = LinearRegression(coef_basis=[beta])
         with np.testing.assert_raises(ValueError):
@@ -306,10 +330,10 @@ class TestScalarLinearRegression(unittest.TestCase):
     def test_error_weights_negative(self):
         """ Test that none of the weights are negative. """
 
-        x_fd = FDataBasis(Monomial(n_basis=7), np.identity(7))
-        y = [1 for _ in range(7)]
-        weights = [-1 for _ in range(7)]
-        beta = Monomial(n_basis=7)
+        x_fd = self.x_fd
+        y = np.ones(7)
+        weights = -np.ones(7)
+        beta = self.x_fd.basis
 
         scalar = LinearRegression(coef_basis=[beta])
         with np.testing.assert_raises(ValueError):
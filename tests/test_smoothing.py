@@ -2,7 +2,7 @@ import skfda
 from skfda._utils import _check_estimator
 from skfda.misc.operators import LinearDifferentialOperator
 from skfda.misc.regularization import TikhonovRegularization
-from skfda.representation.basis import BSpline, Monomial
+from skfda.representation.basis import BSpline, Fourier, Monomial, Tensor
 from skfda.representation.grid import FDataGrid
 import unittest
 
@@ -92,6 +92,49 @@ class TestBasisSmoother(unittest.TestCase):
             np.array([[0.60, 0.47, 0.20, -0.07, -0.20]])
         )
 
+    def test_cholesky_reuse(self):
+        t = np.linspace(0, 1, 10)
+        random_state = np.random.RandomState(0)
+        fd = FDataGrid(random_state.randn(3, 10), sample_points=t)
+        fd2 = FDataGrid(random_state.randn(3, 10), sample_points=t)
+        basis = BSpline((0, 1), n_basis=5)
+
+        def smoother(smoothing_parameter):
+            return smoothing.BasisSmoother(
+                basis=basis,
+                smoothing_parameter=smoothing_parameter,
+                regularization=TikhonovRegularization(
+                    LinearDifferentialOperator(2)),
+                method='cholesky',
+                return_basis=True)
+
+        # The factorization is reused for new data with the same points
+        reused = smoother(10)
+        reused.fit_transform(fd)
+        np.testing.assert_allclose(
+            reused.transform(fd2).coefficients,
+            smoother(10).fit_transform(fd2).coefficients)
+
+        # but not if the penalty changes
+        reused.set_params(smoothing_parameter=1)
+        np.testing.assert_allclose(
+            reused.transform(fd2).coefficients,
+            smoother(1).fit_transform(fd2).coefficients)
+
+    def test_basis_matrix_cache_bounded(self):
+        random_state = np.random.RandomState(0)
+        smoother = smoothing.BasisSmoother(
+            basis=BSpline((0, 1), n_basis=5), return_basis=True)
+
+        for n_points in range(10, 20):
+            t = np.linspace(0, 1, n_points)
+            fd = FDataGrid(random_state.randn(3, n_points), sample_points=t)
+            np.testing.assert_allclose(
+                smoother.fit_transform(fd).coefficients,
+                fd.to_basis(smoother.basis).coefficients)
+
+        self.assertLessEqual(len(smoother._evaluated_cache), 2)
+
     def test_qr(self):
         t = np.linspace(0, 1, 5)
         x = np.sin(2 * np.pi * t) + np.cos(2 * np.pi * t)
@@ -110,6 +153,97 @@ class TestBasisSmoother(unittest.TestCase):
             np.array([[0.60, 0.47, 0.20, -0.07, -0.20]])
         )
 
+    def test_weights(self):
+        t = np.linspace(0, 1, 10)
+        x = np.sin(2 * np.pi * t) + np.cos(2 * np.pi * t)
+        basis = BSpline((0, 1), n_basis=5)
+        fd = FDataGrid(data_matrix=x, sample_points=t)
+        weights = np.diag(np.linspace(0.5, 2, 10))
+
+        coefficients = []
+        for method in smoothing.BasisSmoother.SolverMethod:
+            with self.subTest(method=method):
+                smoother = smoothing.BasisSmoother(
+                    basis=basis,
+                    weights=weights,
+                    smoothing_parameter=10,
+                    regularization=TikhonovRegularization(
+                        LinearDifferentialOperator(2)),
+                    method=method,
+                    return_basis=True)
+                fd_basis = smoother.fit_transform(fd)
+                coefficients.append(fd_basis.coefficients)
+
+                # Transforming again reuses the cached evaluation
+                np.testing.assert_allclose(
+                    smoother.transform(fd).coefficients,
+                    fd_basis.coefficients)
+
+        for c in coefficients[1:]:
+            np.testing.assert_allclose(c, coefficients[0])
+
+    def test_matrix_grid(self):
+        t = np.linspace(0, 1, 10)
+        x = np.sin(2 * np.pi * t) + np.cos(2 * np.pi * t)
+        basis = BSpline((0, 1), n_basis=5)
+        fd = FDataGrid(data_matrix=x, sample_points=t)
+
+        fd_cholesky = smoothing.BasisSmoother(
+            basis=basis, method='cholesky').fit_transform(fd)
+        smoother = smoothing.BasisSmoother(basis=basis, method='matrix')
+        np.testing.assert_allclose(smoother.fit_transform(fd).data_matrix,
+                                   fd_cholesky.data_matrix)
+        np.testing.assert_allclose(smoother.transform(fd).data_matrix,
+                                   fd_cholesky.data_matrix)
+
+    def test_tensor_smoothing(self):
+        t1 = np.linspace(0, 1, 12)
+        t2 = np.linspace(0, 2, 9)
+        random_state = np.random.RandomState(0)
+        fd = FDataGrid(random_state.randn(4, 12, 9), sample_points=[t1, t2])
+        basis = Tensor([BSpline((0, 1), n_basis=5),
+                        Fourier((0, 2), n_basis=3)])
+
+        # Least squares solution computed with the full basis matrix
+        basis_values = basis(skfda._utils._cartesian_product(
+            [t1, t2]))[..., 0].T
+        expected = np.linalg.lstsq(
+            basis_values, fd.data_matrix.reshape((4, -1)).T,
+            rcond=None)[0].T
+
+        for method in smoothing.BasisSmoother.SolverMethod:
+            with self.subTest(method=method):
+                smoother = smoothing.BasisSmoother(
+                    basis=basis,
+                    method=method,
+                    return_basis=True)
+                fd_basis = smoother.fit_transform(fd)
+                np.testing.assert_allclose(fd_basis.coefficients, expected)
+
+    def test_single_precision(self):
+        t = np.linspace(0, 1, 50)
+        random_state = np.random.RandomState(0)
+        data_matrix = random_state.randn(4, 50)
+        basis = BSpline((0, 1), n_basis=8)
+
+        for method in ('cholesky', 'qr'):
+            with self.subTest(method=method):
+                smoother = smoothing.BasisSmoother(
+                    basis=basis,
+                    regularization=TikhonovRegularization(
+                        LinearDifferentialOperator(2)),
+                    method=method,
+                    return_basis=True)
+                coefficients = smoother.fit_transform(
+                    FDataGrid(data_matrix, sample_points=t)).coefficients
+                coefficients_32 = smoother.fit_transform(
+                    FDataGrid(data_matrix.astype(np.float32),
+                              sample_points=t)).coefficients
+
+                self.assertEqual(coefficients_32.dtype, np.float32)
+                np.testing.assert_allclose(
+                    coefficients_32, coefficients, atol=1e-4)
+
     def test_monomial_smoothing(self):
         # It does not have much sense to apply smoothing in this basic case
         # where the fit is very good but its just for testing purposes